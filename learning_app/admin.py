@@ -1,16 +1,48 @@
 from django.contrib import admin
-from .models import Course, Content, Quiz, UserProgress, ClickstreamEvent, VideoAnalytics, TeacherProfile, LiveQuiz, QuizQuestion, QuizParticipant, QuizAnswer, StudentAnalysis, QuizAnalytics
+from .models import Course, Content, Quiz, UserProgress, ClickstreamEvent, VideoAnalytics, TeacherProfile, LiveQuiz, QuizQuestion, QuizParticipant, QuizAnswer, StudentAnalysis, QuizAnalytics, BackgroundJob
+from .progress import invalidate_progress_catalog
+from .quiz_cache import bump_quiz_questions
+from .quiz_join import invalidate_active_codes
+
+
+class CacheInvalidationAdminMixin:
+    """
+    Invalidate a cache after objects are saved or deleted in the admin
+
+    Set `invalidate_cache` to a staticmethod taking the list of changed objects.
+    """
+    invalidate_cache = None
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.invalidate_cache([obj])
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.invalidate_cache([obj])
+    
+    def delete_queryset(self, request, queryset):
+        objects = list(queryset)
+        super().delete_queryset(request, queryset)
+        self.invalidate_cache(objects)
+
+
+def _invalidate_progress_catalog(objects):
+    # Cached content totals used by progress summaries
+    invalidate_progress_catalog()
 
 
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(CacheInvalidationAdminMixin, admin.ModelAdmin):
+    invalidate_cache = staticmethod(_invalidate_progress_catalog)
     list_display = ['title', 'created_at']
     search_fields = ['title', 'description']
     list_filter = ['created_at']
 
 
 @admin.register(Content)
-class ContentAdmin(admin.ModelAdmin):
+class ContentAdmin(CacheInvalidationAdminMixin, admin.ModelAdmin):
+    invalidate_cache = staticmethod(_invalidate_progress_catalog)
     list_display = ['title', 'course', 'content_type', 'order', 'created_at']
     list_filter = ['content_type', 'course', 'created_at']
     search_fields = ['title', 'course__title']
@@ -35,10 +67,11 @@ class UserProgressAdmin(admin.ModelAdmin):
 @admin.register(ClickstreamEvent)
 class ClickstreamEventAdmin(admin.ModelAdmin):
     list_display = ['user', 'event_name', 'component', 'timestamp', 'ip_address']
-    list_filter = ['event_name', 'component', 'timestamp', 'origin']
-    search_fields = ['user__username', 'description', 'ip_address']
+    list_filter = ['event_name', 'timestamp', 'origin']
+    search_fields = ['user__username', 'content__title', 'component__value', 'ip_address']
     readonly_fields = ['timestamp']
-    raw_id_fields = ['user']
+    raw_id_fields = ['user', 'content', 'event_context', 'component', 'user_agent', 'url', 'referrer']
+    list_select_related = ['user', 'component']
     
     def has_add_permission(self, request):
         return False  # Don't allow manual addition of clickstream events
@@ -60,8 +93,14 @@ class TeacherProfileAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'email']
 
 
+def _invalidate_active_codes(quizzes):
+    # Cached active quiz codes used by join_quiz
+    invalidate_active_codes()
+
+
 @admin.register(LiveQuiz)
-class LiveQuizAdmin(admin.ModelAdmin):
+class LiveQuizAdmin(CacheInvalidationAdminMixin, admin.ModelAdmin):
+    invalidate_cache = staticmethod(_invalidate_active_codes)
     list_display = ['title', 'teacher', 'status', 'quiz_code', 'created_at', 'participants_count']
     list_filter = ['status', 'created_at']
     search_fields = ['title', 'teacher__user__username']
@@ -71,8 +110,15 @@ class LiveQuizAdmin(admin.ModelAdmin):
     participants_count.short_description = 'Participants'
 
 
+def _bump_quiz_questions(questions):
+    # Cached questions and answer keys of the quizzes the questions belong to
+    for quiz_id in {question.quiz_id for question in questions}:
+        bump_quiz_questions(quiz_id)
+
+
 @admin.register(QuizQuestion)
-class QuizQuestionAdmin(admin.ModelAdmin):
+class QuizQuestionAdmin(CacheInvalidationAdminMixin, admin.ModelAdmin):
+    invalidate_cache = staticmethod(_bump_quiz_questions)
     list_display = ['quiz', 'order', 'question_text_short', 'correct_answer', 'generation_method']
     list_filter = ['generation_method', 'quiz__status']
     search_fields = ['question_text', 'quiz__title']
@@ -114,4 +160,12 @@ class StudentAnalysisAdmin(admin.ModelAdmin):
 @admin.register(QuizAnalytics)
 class QuizAnalyticsAdmin(admin.ModelAdmin):
     list_display = ['quiz', 'total_participants', 'average_score', 'completion_rate', 'generated_at']
-    search_fields = ['quiz__title'] 
\ No newline at end of file
+    search_fields = ['quiz__title'] 
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'key', 'status', 'attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['key']
+    readonly_fields = ['created_at', 'finished_at', 'last_error']
@@ -0,0 +1,153 @@
+"""
+Clickstream retention - moves old events into month-partitioned gzip archives
+and reads them back alongside the hot table
+"""
+import glob
+import gzip
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_datetime
+
+from .clickstream_query import event_record, filter_events
+from .models import ClickstreamEvent
+
+MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}$')
+
+
+def archive_directory():
+    return str(getattr(settings, 'CLICKSTREAM_ARCHIVE_DIR', os.path.join(settings.MEDIA_ROOT, 'clickstream_archive')))
+
+
+def _month_bounds(month):
+    year, month_number = (int(part) for part in month.split('-'))
+    start = datetime(year, month_number, 1, tzinfo=dt_timezone.utc)
+    if month_number == 12:
+        end = datetime(year + 1, 1, 1, tzinfo=dt_timezone.utc)
+    else:
+        end = datetime(year, month_number + 1, 1, tzinfo=dt_timezone.utc)
+    return start, end
+
+
+def _write_part(directory, month, records):
+    """Write one gzip part file atomically (temp file + rename)"""
+    month_dir = os.path.join(directory, month)
+    os.makedirs(month_dir, exist_ok=True)
+    path = os.path.join(month_dir, f"part-{records[0]['id']:012d}-{records[-1]['id']:012d}.jsonl.gz")
+    tmp_path = path + '.tmp'
+
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as compressed:
+            for record in records:
+                compressed.write((json.dumps(record, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_events(before, batch_size=5000, directory=None):
+    """
+    Move events older than `before` out of the hot table in batches
+
+    Each batch is written to its month partition before it is deleted, so a
+    crash can at worst leave a batch both archived and in the table. The next
+    run rewrites that part file and finishes the delete, and archive readers
+    skip repeated ids in the meantime.
+
+    Returns:
+        int: Number of events archived
+    """
+    directory = directory or archive_directory()
+    archived = 0
+
+    while True:
+        batch = list(
+            ClickstreamEvent.objects.filter(timestamp__lt=before)
+            .select_related(*ClickstreamEvent.DIMENSION_FIELDS)
+            .order_by('timestamp', 'id')[:batch_size]
+        )
+        if not batch:
+            break
+
+        by_month = defaultdict(list)
+        for event in batch:
+            by_month[event.timestamp.astimezone(dt_timezone.utc).strftime('%Y-%m')].append(event_record(event))
+        for month, records in by_month.items():
+            records.sort(key=lambda record: record['id'])
+            _write_part(directory, month, records)
+
+        ClickstreamEvent.objects.filter(id__in=[event.id for event in batch]).delete()
+        archived += len(batch)
+
+    return archived
+
+
+def archived_months(directory=None):
+    """Archived partitions ('YYYY-MM') in chronological order"""
+    directory = directory or archive_directory()
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name for name in os.listdir(directory) if MONTH_PATTERN.match(name))
+
+
+def _matches(record, filters, timestamp):
+    if 'user' in filters and record['user_id'] != filters['user']:
+        return False
+    for name in ('event_name', 'component', 'session_id'):
+        if name in filters and record[name] != filters[name]:
+            return False
+    if 'start' in filters and timestamp < filters['start']:
+        return False
+    if 'end' in filters and timestamp >= filters['end']:
+        return False
+    return True
+
+
+def iter_archived_events(filters=None, directory=None):
+    """
+    Yield archived event records matching the filters (see parse_event_filters).
+    Only partitions overlapping the requested time range are opened.
+    """
+    filters = filters or {}
+    directory = directory or archive_directory()
+
+    for month in archived_months(directory):
+        month_start, month_end = _month_bounds(month)
+        if 'start' in filters and month_end <= filters['start']:
+            continue
+        if 'end' in filters and month_start >= filters['end']:
+            continue
+
+        seen = set()
+        for path in sorted(glob.glob(os.path.join(directory, month, 'part-*.jsonl.gz'))):
+            with gzip.open(path, 'rt', encoding='utf-8') as lines:
+                for line in lines:
+                    record = json.loads(line)
+                    if record['id'] in seen:
+                        continue
+                    seen.add(record['id'])
+                    if _matches(record, filters, parse_datetime(record['timestamp'])):
+                        yield record
+
+
+def iter_events(filters=None, chunk_size=2000):
+    """
+    Yield event records across archived partitions and the hot table,
+    archives first, so callers never need to know where an event lives
+    """
+    filters = filters or {}
+    yield from iter_archived_events(filters)
+
+    hot = (
+        filter_events(filters)
+        .select_related(*ClickstreamEvent.DIMENSION_FIELDS)
+        .order_by('timestamp', 'id')
+    )
+    for event in hot.iterator(chunk_size=chunk_size):
+        yield event_record(event)
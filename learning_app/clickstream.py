@@ -0,0 +1,442 @@
+"""
+Clickstream capture pipeline - buffers events in process and writes them in batches,
+or spools them to local segment files for the ingest_clickstream command
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+def write_events(events):
+    """
+    Persist a batch of clickstream event dicts with a single bulk INSERT
+    and fold them into the minute/hour rollups in the same transaction
+
+    Args:
+        events (list): Event dicts keyed by ClickstreamEvent field names, with
+            plain strings for the dictionary-encoded dimension fields
+
+    Returns:
+        int: Number of events written
+    """
+    from .dimensions import encode_events
+    from .models import ClickstreamEvent
+    from .rollups import update_rollups
+
+    if not events:
+        return 0
+
+    with transaction.atomic():
+        ClickstreamEvent.objects.bulk_create(
+            [ClickstreamEvent(**row) for row in encode_events(events)],
+            batch_size=500,
+        )
+        update_rollups(events)
+    return len(events)
+
+
+class ClickstreamBuffer:
+    """
+    Write-behind buffer for clickstream events.
+
+    Requests only append to an in-memory queue; a background thread drains it
+    with bulk_create once `batch_size` events are waiting or `flush_interval`
+    seconds have passed. Remaining events are flushed when the worker exits.
+    Batches that fail transiently (e.g. a locked database) are requeued; a
+    batch that violates a constraint is retried row by row and only the
+    offending rows are dropped, so one bad event cannot block the queue.
+    """
+
+    def __init__(self, batch_size=50, flush_interval=5.0, max_queue=5000):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+
+        self.flushed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def add(self, event):
+        """Queue an event dict; returns False if the queue is full and it was dropped"""
+        with self._lock:
+            if len(self._events) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._events.append(event)
+            batch_ready = len(self._events) >= self.batch_size
+
+        self._ensure_worker()
+        if batch_ready:
+            self._wake.set()
+        return True
+
+    def flush(self):
+        """Write all queued events now; returns the number of events written"""
+        with self._flush_lock:
+            with self._lock:
+                events, self._events = self._events, []
+
+            if not events:
+                return 0
+
+            try:
+                written = write_events(events)
+            except IntegrityError:
+                logger.warning("Clickstream batch of %d events violates a constraint, writing row by row", len(events))
+                written = self._write_rows(events)
+            except DatabaseError:
+                logger.exception("Clickstream flush failed for %d events", len(events))
+                self._requeue(events)
+                return 0
+
+            with self._lock:
+                self.flushed += written
+            return written
+
+    def pending(self):
+        """Number of events waiting to be flushed"""
+        with self._lock:
+            return len(self._events)
+
+    def stats(self):
+        """Counters for monitoring the buffer"""
+        with self._lock:
+            return {
+                'pending': len(self._events),
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'rejected': self.rejected,
+            }
+
+    def close(self):
+        """Stop the background flusher and write out anything still queued"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+        stats = self.stats()
+        logger.info(
+            "Clickstream buffer closed: %d flushed, %d dropped, %d rejected, %d pending",
+            stats['flushed'], stats['dropped'], stats['rejected'], stats['pending'],
+        )
+
+    def _write_rows(self, events):
+        """Write events one at a time, dropping those that violate a constraint; returns the number written"""
+        written = 0
+        for index, event in enumerate(events):
+            try:
+                written += write_events([event])
+            except IntegrityError:
+                logger.warning("Dropping clickstream event that violates a constraint: %r", event.get('event_name'))
+                with self._lock:
+                    self.rejected += 1
+            except DatabaseError:
+                logger.exception("Clickstream flush failed for %d events", len(events) - index)
+                self._requeue(events[index:])
+                break
+        return written
+
+    def _requeue(self, events):
+        """Put a failed batch back at the head of the queue, dropping what no longer fits"""
+        with self._lock:
+            room = max(0, self.max_queue - len(self._events))
+            kept = events[:room]
+            self.dropped += len(events) - len(kept)
+            self._events = kept + self._events
+
+    def _ensure_worker(self):
+        # Gunicorn forks workers after import, so the thread is started lazily
+        # and restarted if this process did not create it
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='clickstream-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+            if self._stopped.is_set():
+                break
+
+            due = time.monotonic() - last_flush >= self.flush_interval
+            if due or self.pending() >= self.batch_size:
+                self.flush()
+                last_flush = time.monotonic()
+                # The flusher thread owns its own DB connection
+                connection.close()
+
+
+# ============ ON-DISK SPOOL ============
+
+SPOOL_OPEN_SUFFIX = '.jsonl.open'
+SPOOL_SEALED_SUFFIX = '.jsonl'
+
+
+def _segment_id(path):
+    """Segment name without the open/sealed suffix, used as the checkpoint key"""
+    name = os.path.basename(path)
+    for suffix in (SPOOL_OPEN_SUFFIX, SPOOL_SEALED_SUFFIX):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+class ClickstreamSpool:
+    """
+    Append-only JSONL spool for clickstream events.
+
+    Each worker process writes one event per line to its own `.jsonl.open`
+    segment and seals it (renames to `.jsonl`) once it reaches `max_bytes` or
+    `max_age` seconds. Nothing here touches the database; the
+    ingest_clickstream command loads the segments.
+    """
+
+    def __init__(self, directory, max_bytes=8 * 1024 * 1024, max_age=60):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.spooled = 0
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._pid = None
+        self._sequence = 0
+
+    def add(self, event):
+        """Append an event dict to the current segment; returns False if it was dropped"""
+        line = (json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n').encode('utf-8')
+
+        with self._lock:
+            try:
+                self._rotate_if_needed()
+                # One write per line so a crash can only ever leave a partial last line
+                self._file.write(line)
+                self._file.flush()
+            except OSError:
+                logger.exception("Clickstream spool write failed")
+                self.dropped += 1
+                return False
+            self.spooled += 1
+        return True
+
+    def stats(self):
+        """Counters for monitoring the spool"""
+        with self._lock:
+            return {
+                'segment': self._path,
+                'spooled': self.spooled,
+                'dropped': self.dropped,
+            }
+
+    def close(self):
+        """Seal the current segment so it can be ingested"""
+        with self._lock:
+            if self._file and self._pid == os.getpid():
+                self._seal()
+
+        logger.info("Clickstream spool closed: %d spooled, %d dropped", self.spooled, self.dropped)
+
+    def _rotate_if_needed(self):
+        if self._file is not None and self._pid != os.getpid():
+            # Forked child: the parent owns that segment
+            self._file = None
+
+        if self._file is not None:
+            too_big = self._file.tell() >= self.max_bytes
+            too_old = time.time() - self._opened_at >= self.max_age
+            if not (too_big or too_old):
+                return
+            self._seal()
+
+        self._open_segment()
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._sequence += 1
+        self._opened_at = time.time()
+        name = f"clickstream-{int(self._opened_at * 1000):015d}-{self._pid}-{self._sequence:06d}"
+        self._path = os.path.join(self.directory, name + SPOOL_OPEN_SUFFIX)
+        self._file = open(self._path, 'ab')
+
+    def _seal(self):
+        file, path = self._file, self._path
+        self._file = None
+        try:
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+            os.rename(path, path[:-len(SPOOL_OPEN_SUFFIX)] + SPOOL_SEALED_SUFFIX)
+        except FileNotFoundError:
+            # Already sealed by ingest_clickstream as a stale segment
+            pass
+
+
+def list_spool_segments(directory):
+    """Sealed and open segment paths in capture order"""
+    paths = glob.glob(os.path.join(str(directory), 'clickstream-*' + SPOOL_SEALED_SUFFIX))
+    paths += glob.glob(os.path.join(str(directory), 'clickstream-*' + SPOOL_OPEN_SUFFIX))
+    return sorted(paths, key=_segment_id)
+
+
+def seal_stale_segments(directory, max_age):
+    """
+    Seal open segments left behind by workers that died without closing them.
+
+    A live writer rotates before writing to a segment older than its max_age,
+    so anything created well before that can no longer receive events.
+    """
+    sealed = 0
+    cutoff_ms = (time.time() - max_age) * 1000
+    for path in glob.glob(os.path.join(str(directory), 'clickstream-*' + SPOOL_OPEN_SUFFIX)):
+        try:
+            created_ms = int(_segment_id(path).split('-')[1])
+        except (IndexError, ValueError):
+            continue
+        if created_ms < cutoff_ms:
+            try:
+                os.rename(path, path[:-len(SPOOL_OPEN_SUFFIX)] + SPOOL_SEALED_SUFFIX)
+                sealed += 1
+            except FileNotFoundError:
+                pass
+    return sealed
+
+
+def _decode_event(line):
+    event = json.loads(line)
+    if event.get('timestamp'):
+        event['timestamp'] = parse_datetime(event['timestamp'])
+    return event
+
+
+def ingest_segment(path, batch_size=1000):
+    """
+    Load a spool segment into ClickstreamEvent from its last checkpoint.
+
+    Every batch is inserted in the same transaction that advances the
+    segment's checkpoint, so a crash at any point neither loses nor repeats
+    events. Sealed segments are deleted once fully loaded.
+
+    Returns:
+        int: Number of events ingested
+    """
+    from .models import ClickstreamSpoolCheckpoint
+
+    segment = _segment_id(path)
+    sealed = not path.endswith(SPOOL_OPEN_SUFFIX)
+    checkpoint, _ = ClickstreamSpoolCheckpoint.objects.get_or_create(segment=segment)
+    offset = checkpoint.offset
+    ingested = 0
+
+    try:
+        handle = open(path, 'rb')
+    except FileNotFoundError:
+        # Sealed between listing and opening; picked up on the next pass
+        return 0
+
+    with handle:
+        at_end = False
+        while not at_end:
+            handle.seek(offset)
+            events = []
+            end = offset
+            for _ in range(batch_size):
+                line = handle.readline()
+                if not line.endswith(b'\n'):
+                    # EOF or a line the writer has not finished yet
+                    at_end = True
+                    break
+                end += len(line)
+                if line.strip():
+                    try:
+                        events.append(_decode_event(line))
+                    except ValueError:
+                        logger.warning("Skipping corrupt clickstream line in %s at byte %d", segment, end - len(line))
+
+            if end == offset:
+                break
+
+            with transaction.atomic():
+                write_events(events)
+                ClickstreamSpoolCheckpoint.objects.filter(segment=segment).update(offset=end)
+            ingested += len(events)
+            offset = end
+
+    if sealed:
+        if offset < os.path.getsize(path):
+            # A sealed segment never grows, so this is a line cut off by a crashed writer
+            logger.warning("Discarding truncated last line of clickstream segment %s", segment)
+        # Remove the file before the checkpoint: a crash in between leaves only
+        # an orphaned checkpoint row, never a file that would be loaded twice
+        os.remove(path)
+        ClickstreamSpoolCheckpoint.objects.filter(segment=segment).delete()
+
+    return ingested
+
+
+def ingest_spool(directory, batch_size=1000, stale_after=None):
+    """Ingest every segment in the spool directory; returns the number of events loaded"""
+    if stale_after:
+        seal_stale_segments(directory, stale_after)
+
+    total = 0
+    for path in list_spool_segments(directory):
+        total += ingest_segment(path, batch_size=batch_size)
+    return total
+
+
+def _create_sink():
+    sink = getattr(settings, 'CLICKSTREAM_SINK', 'buffer')
+    if sink == 'spool':
+        return ClickstreamSpool(
+            directory=settings.CLICKSTREAM_SPOOL_DIR,
+            max_bytes=getattr(settings, 'CLICKSTREAM_SPOOL_MAX_BYTES', 8 * 1024 * 1024),
+            max_age=getattr(settings, 'CLICKSTREAM_SPOOL_MAX_AGE', 60),
+        )
+    return ClickstreamBuffer(
+        batch_size=getattr(settings, 'CLICKSTREAM_BATCH_SIZE', 50),
+        flush_interval=getattr(settings, 'CLICKSTREAM_FLUSH_INTERVAL', 5.0),
+        max_queue=getattr(settings, 'CLICKSTREAM_MAX_QUEUE', 5000),
+    )
+
+
+# Where log_clickstream_event sends events: the write-behind buffer or the disk spool
+clickstream_sink = _create_sink()
+
+# Gunicorn workers exit through sys.exit on graceful shutdown, which runs atexit hooks
+atexit.register(clickstream_sink.close)
@@ -0,0 +1,120 @@
+"""
+Filtering and keyset pagination over ClickstreamEvent
+"""
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .dimensions import lookup_dimension_id
+from .models import ClickstreamEvent
+from .utils import parse_datetime_param
+
+FILTER_PARAMS = ['user', 'event_name', 'component', 'session_id', 'start', 'end']
+
+
+def parse_event_filters(params):
+    """
+    Read clickstream filters from a QueryDict
+
+    Returns:
+        dict: Non-empty filters, with user as an int and start/end as aware datetimes
+
+    Raises:
+        ValueError: If user, start or end is malformed
+    """
+    filters = {}
+    for name in FILTER_PARAMS:
+        value = (params.get(name) or '').strip()
+        if not value:
+            continue
+        if name == 'user':
+            filters[name] = int(value)
+        elif name in ('start', 'end'):
+            filters[name] = parse_datetime_param(value)
+        else:
+            filters[name] = value
+    return filters
+
+
+def filter_events(filters, queryset=None):
+    """Apply parsed filters to a ClickstreamEvent queryset (start inclusive, end exclusive)"""
+    events = ClickstreamEvent.objects.all() if queryset is None else queryset
+    if 'user' in filters:
+        events = events.filter(user_id=filters['user'])
+    if 'event_name' in filters:
+        events = events.filter(event_name=filters['event_name'])
+    if 'component' in filters:
+        component_id = lookup_dimension_id('component', filters['component'])
+        if component_id is None:
+            return events.none()
+        events = events.filter(component_id=component_id)
+    if 'session_id' in filters:
+        events = events.filter(session_id=filters['session_id'])
+    if 'start' in filters:
+        events = events.filter(timestamp__gte=filters['start'])
+    if 'end' in filters:
+        events = events.filter(timestamp__lt=filters['end'])
+    return events
+
+
+def event_record(event):
+    """
+    Plain dict for a ClickstreamEvent with its dimensions decoded to strings;
+    the same shape is stored in archive partitions
+    """
+    return {
+        'id': event.id,
+        'timestamp': event.timestamp.isoformat(),
+        'user_id': event.user_id,
+        'event_name': event.event_name,
+        'event_context': str(event.event_context or ''),
+        'component': str(event.component or ''),
+        'content_id': event.content_id,
+        'payload': event.payload,
+        'description': event.description,
+        'origin': event.origin,
+        'ip_address': event.ip_address,
+        'user_agent': str(event.user_agent or ''),
+        'url': str(event.url or ''),
+        'referrer': str(event.referrer or ''),
+        'session_id': event.session_id,
+        'duration_ms': event.duration_ms,
+    }
+
+
+def encode_cursor(event):
+    """Opaque cursor pointing just after `event` in (-timestamp, -id) order"""
+    raw = json.dumps([event.timestamp.isoformat(), event.pk]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for anything malformed"""
+    try:
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        timestamp = parse_datetime(timestamp)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if timestamp is None or not isinstance(pk, int):
+        raise ValueError('Invalid cursor')
+    return timestamp, pk
+
+
+def keyset_page(events, cursor=None, limit=50):
+    """
+    Fetch one page of events newest first, seeking from the cursor instead of
+    using OFFSET, so every page costs one index range scan
+
+    Returns:
+        tuple: (list of events, cursor for the next page or None)
+    """
+    events = events.order_by('-timestamp', '-id')
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        events = events.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+
+    page = list(events[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
@@ -0,0 +1,124 @@
+"""
+Dictionary encoding for low-cardinality clickstream strings (component, url, user agent, ...)
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ClickstreamDimension, ClickstreamEvent
+
+
+class DimensionCache:
+    """
+    Thread-safe LRU of (kind, value) -> ClickstreamDimension id.
+
+    Keeps the write path free of lookup queries for the strings every event
+    repeats; misses are resolved for a whole batch with one SELECT and one
+    INSERT.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            dimension_id = self._ids.get(key)
+            if dimension_id is not None:
+                self._ids.move_to_end(key)
+            return dimension_id
+
+    def update(self, mapping):
+        with self._lock:
+            for key, dimension_id in mapping.items():
+                self._ids[key] = dimension_id
+                self._ids.move_to_end(key)
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+dimension_cache = DimensionCache(maxsize=getattr(settings, 'CLICKSTREAM_DIMENSION_CACHE_SIZE', 10000))
+
+
+def _fetch_ids(kind, values):
+    ids = {}
+    for dimension_id, value in ClickstreamDimension.objects.filter(kind=kind, value__in=values).values_list('id', 'value'):
+        ids[(kind, value)] = dimension_id
+    return ids
+
+
+def resolve_dimensions(keys):
+    """
+    Map (kind, value) pairs to dimension ids, creating missing dimensions
+
+    Returns:
+        dict: (kind, value) -> id
+    """
+    resolved = {}
+    missing = {}
+    for key in set(keys):
+        dimension_id = dimension_cache.get(key)
+        if dimension_id is None:
+            missing.setdefault(key[0], set()).add(key[1])
+        else:
+            resolved[key] = dimension_id
+
+    fetched = {}
+    for kind, values in missing.items():
+        found = _fetch_ids(kind, values)
+        new_values = values - {value for _, value in found}
+        if new_values:
+            # Another worker may insert the same value concurrently; re-read after
+            ClickstreamDimension.objects.bulk_create(
+                [ClickstreamDimension(kind=kind, value=value) for value in new_values],
+                ignore_conflicts=True,
+            )
+            found.update(_fetch_ids(kind, new_values))
+        fetched.update(found)
+
+    if fetched:
+        # Only cache ids once the rows that may have just been inserted are committed
+        transaction.on_commit(lambda: dimension_cache.update(fetched))
+    resolved.update(fetched)
+    return resolved
+
+
+def lookup_dimension_id(kind, value):
+    """Id of an existing dimension, or None if the value was never recorded"""
+    key = (kind, value)
+    dimension_id = dimension_cache.get(key)
+    if dimension_id is None:
+        dimension_id = _fetch_ids(kind, [value]).get(key)
+        if dimension_id is not None:
+            dimension_cache.update({key: dimension_id})
+    return dimension_id
+
+
+def encode_events(events):
+    """
+    Turn event dicts with plain strings into ClickstreamEvent constructor kwargs
+    that reference dimension ids. Empty optional strings are stored as NULL.
+    """
+    keys = [
+        (field, event[field])
+        for event in events
+        for field in ClickstreamEvent.DIMENSION_FIELDS
+        if event.get(field)
+    ]
+    ids = resolve_dimensions(keys)
+
+    rows = []
+    for event in events:
+        row = {key: value for key, value in event.items() if key not in ClickstreamEvent.DIMENSION_FIELDS}
+        for field in ClickstreamEvent.DIMENSION_FIELDS:
+            value = event.get(field)
+            row[f'{field}_id'] = ids[(field, value)] if value else None
+        rows.append(row)
+    return rows
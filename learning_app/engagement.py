@@ -0,0 +1,140 @@
+"""
+Per-second video engagement curves (views and distinct viewers per second)
+
+Counts are stored packed in VideoEngagement and updated incrementally with
+watched segments: each update is a difference array plus cumsum over the
+video's seconds, never a rescan of events.
+"""
+import numpy as np
+from django.db import transaction
+
+from .models import VideoAnalytics, VideoEngagement
+
+COUNT_DTYPE = np.dtype('<u4')
+
+# Curve length for videos whose duration is not set (segments past it are cut off)
+MAX_CURVE_SECONDS = 24 * 60 * 60
+
+
+def unpack_counts(data, length=0):
+    """Packed uint32 counts as an int64 array of at least `length` seconds"""
+    counts = np.frombuffer(bytes(data or b''), dtype=COUNT_DTYPE).astype(np.int64)
+    if len(counts) < length:
+        counts = np.concatenate([counts, np.zeros(length - len(counts), dtype=np.int64)])
+    return counts
+
+
+def pack_counts(counts):
+    return np.clip(counts, 0, np.iinfo(COUNT_DTYPE).max).astype(COUNT_DTYPE).tobytes()
+
+
+def segment_counts(segments, length):
+    """How many of the [start, end) segments cover each second"""
+    diff = np.zeros(length + 1, dtype=np.int64)
+    if segments:
+        bounds = np.asarray(segments, dtype=np.int64).reshape(-1, 2)
+        np.add.at(diff, bounds[:, 0], 1)
+        np.add.at(diff, bounds[:, 1], -1)
+    return np.cumsum(diff[:-1])
+
+
+def _length(duration, *segment_lists):
+    """Curve length: the video duration if known, else the furthest segment end up to MAX_CURVE_SECONDS"""
+    if duration:
+        return duration
+    ends = [end for segments in segment_lists for _, end in segments]
+    return min(max([0] + ends), MAX_CURVE_SECONDS)
+
+
+def _clip(segments, length):
+    """Cut [start, end) segments off at `length`, dropping those that start past it"""
+    clipped = []
+    for start, end in segments:
+        start, end = max(start, 0), min(end, length)
+        if start < end:
+            clipped.append((start, end))
+    return clipped
+
+
+def apply_engagement(content_id, duration, views, viewers):
+    """
+    Add watched segments to a video's engagement curve
+
+    Args:
+        duration (int): Video length in seconds; segments are cut off there.
+            If unknown (0) the curve grows with the segments, up to MAX_CURVE_SECONDS
+        views (list): [start, end) segments watched, rewatches included
+        viewers (list): [start, end) segments a user watched for the first time
+    """
+    if not views and not viewers:
+        return
+
+    with transaction.atomic():
+        engagement, _ = VideoEngagement.objects.select_for_update().get_or_create(content_id=content_id)
+        length = _length(duration, views, viewers)
+        if not duration:
+            length = max(length, min(len(engagement.views) // COUNT_DTYPE.itemsize, MAX_CURVE_SECONDS))
+        views, viewers = _clip(views, length), _clip(viewers, length)
+
+        engagement.views = pack_counts(unpack_counts(engagement.views, length)[:length] + segment_counts(views, length))
+        engagement.viewers = pack_counts(unpack_counts(engagement.viewers, length)[:length] + segment_counts(viewers, length))
+        engagement.save(update_fields=['views', 'viewers', 'updated_at'])
+
+
+def rebuild_engagement(content):
+    """
+    Recompute a video's curve from every user's stored watched intervals
+
+    Rewatch history is not stored per user, so after a rebuild views start
+    out equal to viewers.
+
+    Returns:
+        int: Number of users folded in
+    """
+    from .video_positions import WatchedIntervals
+
+    segments = []
+    users = 0
+    for packed in VideoAnalytics.objects.filter(content=content).values_list('watched_intervals', flat=True).iterator():
+        intervals = WatchedIntervals.from_bytes(packed)
+        segments.extend(zip(intervals.starts, intervals.ends))
+        users += 1
+
+    length = _length(content.video_duration, segments)
+    counts = pack_counts(segment_counts(_clip(segments, length), length))
+    VideoEngagement.objects.update_or_create(content=content, defaults={'views': counts, 'viewers': counts})
+    return users
+
+
+def engagement_curve(content, bucket=1):
+    """
+    Engagement curve for charts, optionally summed into `bucket`-second bins
+    (views are summed; viewers take the bin maximum)
+
+    Returns:
+        dict: content_id, duration, bucket, views, viewers, plus per-bin rewatch ratios
+    """
+    engagement = VideoEngagement.objects.filter(content=content).first()
+    length = content.video_duration or 0
+    views = unpack_counts(engagement.views if engagement else b'', length)
+    if length:
+        views = views[:length]
+    viewers = unpack_counts(engagement.viewers if engagement else b'', len(views))[:len(views)]
+
+    if bucket > 1 and len(views):
+        padded = -(-len(views) // bucket) * bucket
+        views = np.pad(views, (0, padded - len(views))).reshape(-1, bucket).sum(axis=1)
+        viewers = np.pad(viewers, (0, padded - len(viewers))).reshape(-1, bucket).max(axis=1)
+
+    # Average times each viewer watched a second of the bin
+    rewatch = views / np.maximum(viewers * bucket, 1)
+
+    return {
+        'content_id': content.id,
+        'duration': content.video_duration,
+        'bucket': bucket,
+        'views': views.tolist(),
+        'viewers': viewers.tolist(),
+        'rewatch_ratio': np.round(rewatch, 2).tolist(),
+        'updated_at': engagement.updated_at.isoformat() if engagement else None,
+    }
@@ -0,0 +1,113 @@
+"""
+Streaming CSV / JSONL exports of clickstream and progress data
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .archive import iter_events
+from .clickstream_query import event_record, filter_events, parse_event_filters
+from .models import ClickstreamEvent, UserProgress, VideoAnalytics
+from .utils import parse_datetime_param
+
+CHUNK_SIZE = 2000
+
+CLICKSTREAM_COLUMNS = [
+    'id', 'timestamp', 'user_id', 'event_name', 'event_context', 'component', 'content_id', 'payload',
+    'description', 'origin', 'ip_address', 'user_agent', 'url', 'referrer', 'session_id', 'duration_ms',
+]
+
+PROGRESS_COLUMNS = [
+    'id', 'user_id', 'user__username', 'content_id', 'content__title', 'content__course_id',
+    'completed', 'completed_at', 'video_watched_duration', 'quiz_score',
+]
+
+VIDEO_COLUMNS = [
+    'id', 'user_id', 'user__username', 'content_id', 'content__title', 'play_timestamp',
+    'pause_timestamp', 'current_time', 'total_watched', 'completed',
+]
+
+
+def _bool_param(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def clickstream_rows(params):
+    """Clickstream records matching the browser filters; ?include_archive=1 also reads archives"""
+    filters = parse_event_filters(params)
+    if _bool_param(params.get('include_archive', '')):
+        return iter_events(filters, chunk_size=CHUNK_SIZE)
+
+    events = (
+        filter_events(filters)
+        .select_related(*ClickstreamEvent.DIMENSION_FIELDS)
+        .order_by('timestamp', 'id')
+    )
+    return (event_record(event) for event in events.iterator(chunk_size=CHUNK_SIZE))
+
+
+def _filter_progress_like(queryset, params, time_field):
+    if params.get('user'):
+        queryset = queryset.filter(user_id=int(params['user']))
+    if params.get('content'):
+        queryset = queryset.filter(content_id=int(params['content']))
+    if params.get('course'):
+        queryset = queryset.filter(content__course_id=int(params['course']))
+    if params.get('completed'):
+        queryset = queryset.filter(completed=_bool_param(params['completed']))
+    start = parse_datetime_param(params.get('start'))
+    if start:
+        queryset = queryset.filter(**{f'{time_field}__gte': start})
+    end = parse_datetime_param(params.get('end'))
+    if end:
+        queryset = queryset.filter(**{f'{time_field}__lt': end})
+    return queryset
+
+
+def progress_rows(params):
+    """UserProgress rows; filters: user, content, course, completed, start/end on completed_at"""
+    progress = _filter_progress_like(UserProgress.objects.all(), params, 'completed_at')
+    return progress.order_by('id').values(*PROGRESS_COLUMNS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def video_rows(params):
+    """VideoAnalytics rows; filters: user, content, course, completed, start/end on play_timestamp"""
+    videos = _filter_progress_like(VideoAnalytics.objects.all(), params, 'play_timestamp')
+    return videos.order_by('id').values(*VIDEO_COLUMNS).iterator(chunk_size=CHUNK_SIZE)
+
+
+# dataset name -> (columns, row generator factory)
+EXPORT_DATASETS = {
+    'clickstream': (CLICKSTREAM_COLUMNS, clickstream_rows),
+    'progress': (PROGRESS_COLUMNS, progress_rows),
+    'video': (VIDEO_COLUMNS, video_rows),
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    """Yield a CSV file one line at a time; nested values are JSON-encoded"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row.get(column)
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, separators=(',', ':'))
+            elif hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            values.append('' if value is None else value)
+        yield writer.writerow(values)
+
+
+def stream_jsonl(columns, rows):
+    """Yield one JSON object per line"""
+    for row in rows:
+        yield json.dumps({column: row.get(column) for column in columns}, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
@@ -0,0 +1,235 @@
+"""
+Session reconstruction and funnel analytics over the clickstream
+
+Events for a time window are loaded in chunks into NumPy column arrays and
+split into sessions (session_id, then inactivity gap) with vectorized passes,
+so a semester of events is processed in seconds.
+"""
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .dimensions import lookup_dimension_id
+from .models import ClickstreamEvent, Content
+
+# Funnel steps in order; a session reaches a step only after the previous one
+FUNNEL_STEPS = ['course_detail', 'content_view', 'quiz_submit']
+STEP_COURSE_DETAIL, STEP_CONTENT_VIEW, STEP_QUIZ_SUBMIT = range(len(FUNNEL_STEPS))
+NO_STEP = -1
+
+LOAD_CHUNK_SIZE = 50000
+
+
+def session_gap():
+    return timedelta(minutes=getattr(settings, 'CLICKSTREAM_SESSION_GAP_MINUTES', 30))
+
+
+class EventColumns:
+    """Clickstream events of one window as parallel arrays, in (timestamp, id) order"""
+
+    def __init__(self, session_key, user_id, timestamp, step, content_id):
+        self.session_key = session_key  # int64 code per session_id (or per user without one)
+        self.user_id = user_id          # int64, 0 for anonymous
+        self.timestamp = timestamp      # float64 epoch seconds
+        self.step = step                # int8 funnel step, NO_STEP if not a funnel event
+        self.content_id = content_id    # int64, 0 when the event has no content
+
+    def __len__(self):
+        return len(self.timestamp)
+
+
+def load_event_columns(start, end, chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Read the events in [start, end) into column arrays, chunk_size rows at a time
+
+    Returns:
+        EventColumns
+    """
+    course_detail_id = lookup_dimension_id('component', 'Course Detail')
+
+    rows = (
+        ClickstreamEvent.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .order_by('timestamp', 'id')
+        .values_list('session_id', 'user_id', 'timestamp', 'event_name', 'component_id', 'content_id')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    session_codes = {}
+    columns = {name: [] for name in ('session_key', 'user_id', 'timestamp', 'step', 'content_id')}
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        session_key = np.empty(len(chunk), dtype=np.int64)
+        user_id = np.empty(len(chunk), dtype=np.int64)
+        timestamp = np.empty(len(chunk), dtype=np.float64)
+        step = np.full(len(chunk), NO_STEP, dtype=np.int8)
+        content_id = np.empty(len(chunk), dtype=np.int64)
+
+        for i, (session_id, user, ts, event_name, component_id, content) in enumerate(chunk):
+            # Events without a session id are grouped per user (anonymous ones all together)
+            key = session_id or f'user:{user or 0}'
+            session_key[i] = session_codes.setdefault(key, len(session_codes))
+            user_id[i] = user or 0
+            timestamp[i] = ts.timestamp()
+            content_id[i] = content or 0
+            if event_name == 'page_view':
+                if component_id is not None and component_id == course_detail_id:
+                    step[i] = STEP_COURSE_DETAIL
+                elif content:
+                    step[i] = STEP_CONTENT_VIEW
+            elif event_name == 'quiz_submit':
+                step[i] = STEP_QUIZ_SUBMIT
+
+        for name, values in (('session_key', session_key), ('user_id', user_id), ('timestamp', timestamp),
+                             ('step', step), ('content_id', content_id)):
+            columns[name].append(values)
+
+    empty = {'session_key': np.int64, 'user_id': np.int64, 'timestamp': np.float64,
+             'step': np.int8, 'content_id': np.int64}
+    return EventColumns(**{
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=empty[name])
+        for name, parts in columns.items()
+    })
+
+
+def assign_sessions(events, gap_seconds):
+    """
+    Split events into sessions: a new session starts when the session key
+    changes or more than gap_seconds pass between consecutive events
+
+    Returns:
+        tuple: (sort order, session number per sorted event, number of sessions)
+    """
+    order = np.lexsort((events.timestamp, events.session_key))
+    keys = events.session_key[order]
+    times = events.timestamp[order]
+
+    starts = np.ones(len(order), dtype=bool)
+    if len(order) > 1:
+        starts[1:] = (keys[1:] != keys[:-1]) | (np.diff(times) > gap_seconds)
+    session = np.cumsum(starts) - 1
+    return order, session, int(starts.sum())
+
+
+def _funnel(step, times, session, n_sessions):
+    """First time each session reaches each step, respecting step order"""
+    reached_at = np.full(n_sessions, -np.inf)
+    counts = []
+    for index in range(len(FUNNEL_STEPS)):
+        first = np.full(n_sessions, np.inf)
+        mask = (step == index) & (times >= reached_at[session])
+        np.minimum.at(first, session[mask], times[mask])
+        counts.append(int(np.isfinite(first).sum()))
+        reached_at = first
+
+    funnel = []
+    for index, name in enumerate(FUNNEL_STEPS):
+        previous = counts[index - 1] if index else counts[0]
+        funnel.append({
+            'step': name,
+            'sessions': counts[index],
+            'conversion': round(counts[index] / previous * 100, 1) if previous else 0.0,
+        })
+    return funnel
+
+
+def _content_dwell(step, times, session, content_id):
+    """Views, dwell time (until the next event in the session) and exits per Content"""
+    is_view = (step == STEP_CONTENT_VIEW) & (content_id > 0)
+    if not is_view.any():
+        return []
+
+    # Dwell runs until the next event of the same session; the last event of a session is an exit
+    has_next = np.zeros(len(times), dtype=bool)
+    has_next[:-1] = session[1:] == session[:-1]
+    dwell = np.full(len(times), np.nan)
+    dwell[:-1] = np.where(has_next[:-1], times[1:] - times[:-1], np.nan)
+
+    view_content = content_id[is_view]
+    view_dwell = dwell[is_view]
+    view_exit = ~has_next[is_view]
+
+    ids, inverse = np.unique(view_content, return_inverse=True)
+    views = np.bincount(inverse)
+    exits = np.bincount(inverse, weights=view_exit)
+    timed = ~np.isnan(view_dwell)
+    timed_counts = np.bincount(inverse[timed], minlength=len(ids))
+    dwell_sums = np.bincount(inverse[timed], weights=view_dwell[timed], minlength=len(ids))
+
+    # Medians: sort dwell values by content, then split at the group boundaries
+    by_content = np.lexsort((view_dwell[timed], inverse[timed]))
+    groups = np.split(view_dwell[timed][by_content], np.cumsum(timed_counts)[:-1])
+
+    titles = dict(Content.objects.filter(id__in=ids.tolist()).values_list('id', 'title'))
+    results = []
+    for index, content in enumerate(ids.tolist()):
+        results.append({
+            'content_id': content,
+            'title': titles.get(content, ''),
+            'views': int(views[index]),
+            'avg_dwell_seconds': round(float(dwell_sums[index] / timed_counts[index]), 1) if timed_counts[index] else None,
+            'median_dwell_seconds': round(float(np.median(groups[index])), 1) if timed_counts[index] else None,
+            'exits': int(exits[index]),
+            'drop_off_rate': round(float(exits[index] / views[index]) * 100, 1),
+        })
+    results.sort(key=lambda row: row['views'], reverse=True)
+    return results
+
+
+def analyze_window(start, end, gap=None):
+    """
+    Reconstruct sessions in [start, end) and compute the funnel and per-content stats
+
+    Returns:
+        dict: sessions, events, average session length, funnel steps and content rows
+    """
+    gap = gap or session_gap()
+    events = load_event_columns(start, end)
+    order, session, n_sessions = assign_sessions(events, gap.total_seconds())
+
+    times = events.timestamp[order]
+    step = events.step[order]
+    content_id = events.content_id[order]
+
+    if n_sessions:
+        first = np.full(n_sessions, np.inf)
+        last = np.full(n_sessions, -np.inf)
+        np.minimum.at(first, session, times)
+        np.maximum.at(last, session, times)
+        avg_session_seconds = round(float((last - first).mean()), 1)
+    else:
+        avg_session_seconds = 0.0
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'gap_minutes': gap.total_seconds() / 60,
+        'events': len(events),
+        'sessions': n_sessions,
+        'users': int(np.unique(events.user_id[events.user_id > 0]).size),
+        'avg_session_seconds': avg_session_seconds,
+        'funnel': _funnel(step, times, session, n_sessions),
+        'content': _content_dwell(step, times, session, content_id),
+    }
+
+
+def cached_window_analysis(start, end, gap=None):
+    """
+    analyze_window() cached per (start, end, gap); windows that are already
+    closed are kept longer than ones still receiving events
+    """
+    gap = gap or session_gap()
+    key = f'funnel:{start.isoformat()}:{end.isoformat()}:{int(gap.total_seconds())}'
+    result = cache.get(key)
+    if result is None:
+        result = analyze_window(start, end, gap)
+        closed = end + gap < timezone.now()
+        cache.set(key, result, getattr(settings, 'CLICKSTREAM_FUNNEL_CACHE_SECONDS', 300) * (12 if closed else 1))
+    return result
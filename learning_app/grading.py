@@ -0,0 +1,69 @@
+"""
+Live quiz grading - the answer key comes from the quiz cache, grading runs in
+memory, then one bulk INSERT for the answers and one conditional UPDATE for
+the score, so a submission costs the same number of queries however long the
+quiz is
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QuizAnswer, QuizParticipant
+from .quiz_analytics import record_submission_stats
+
+
+def grade_answers(answer_key, answers):
+    """
+    Grade a submission against an answer key
+
+    Args:
+        answer_key (dict): question_id -> correct answer letter
+        answers (dict): question_id (str or int) -> selected answer letter
+
+    Returns:
+        tuple: (list of (question_id, selected_answer, is_correct), score)
+
+    Raises:
+        ValueError: If an answered question is not in the answer key
+    """
+    graded = []
+    for question_id, selected_answer in answers.items():
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            raise ValueError(f'Unknown question: {question_id}')
+        if question_id not in answer_key:
+            raise ValueError(f'Unknown question: {question_id}')
+        graded.append((question_id, selected_answer, selected_answer == answer_key[question_id]))
+    return graded, sum(1 for _, _, is_correct in graded if is_correct)
+
+
+def submit_answers(participant, answer_key, answers):
+    """
+    Grade and store a participant's submission
+
+    The participant row is claimed with UPDATE ... WHERE submitted_at IS NULL,
+    so of two concurrent submits only one writes answers; the other returns False.
+    The quiz's running analytics counters are updated in the same transaction.
+
+    Returns:
+        bool: True if this call recorded the submission, False if it was already submitted
+    """
+    graded, score = grade_answers(answer_key, answers)
+    submitted_at = timezone.now()
+
+    with transaction.atomic():
+        claimed = QuizParticipant.objects.filter(id=participant.id, submitted_at__isnull=True).update(
+            score=score, submitted_at=submitted_at,
+        )
+        if not claimed:
+            return False
+        QuizAnswer.objects.bulk_create([
+            QuizAnswer(participant_id=participant.id, question_id=question_id,
+                       selected_answer=selected_answer, is_correct=is_correct)
+            for question_id, selected_answer, is_correct in graded
+        ])
+        record_submission_stats(participant.quiz_id, score, graded)
+
+    participant.score = score
+    participant.submitted_at = submitted_at
+    return True
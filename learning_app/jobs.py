@@ -0,0 +1,178 @@
+"""
+Database-backed background job queue
+
+Views enqueue work with enqueue(); `manage.py run_jobs` claims due jobs and
+runs their handlers on a thread pool. Jobs are claimed with a conditional
+UPDATE (no row locks needed, so it works on SQLite too), retried with
+exponential backoff up to JOB_MAX_ATTEMPTS, and jobs left 'running' by a
+worker that died are picked up again after JOB_LOCK_SECONDS.
+
+Deployments without a run_jobs process turn JOBS_RUN_INLINE on: each job
+is then handed to a small in-process thread pool once the enqueuing
+transaction commits, so the request still returns without waiting for it.
+"""
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BackgroundJob, QuizParticipant
+
+STUDENT_ANALYSIS = 'student_analysis'
+
+
+def _run_student_analysis(payload):
+    from .views import generate_student_analysis
+
+    participant = QuizParticipant.objects.filter(id=payload['participant_id']).first()
+    if participant is not None:
+        generate_student_analysis(participant)
+
+
+# kind -> handler(payload)
+JOB_HANDLERS = {
+    STUDENT_ANALYSIS: _run_student_analysis,
+}
+
+
+def _max_attempts():
+    return getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+
+def _retry_seconds():
+    return getattr(settings, 'JOB_RETRY_SECONDS', 30)
+
+
+def _lock_timeout():
+    return timedelta(seconds=getattr(settings, 'JOB_LOCK_SECONDS', 600))
+
+
+def _run_inline():
+    return getattr(settings, 'JOBS_RUN_INLINE', False)
+
+
+INLINE_WORKERS = 2
+
+_inline_pool = None
+_inline_pool_lock = threading.Lock()
+
+
+def _submit_inline(job_id):
+    global _inline_pool
+    with _inline_pool_lock:
+        if _inline_pool is None:
+            _inline_pool = ThreadPoolExecutor(max_workers=INLINE_WORKERS, thread_name_prefix='inline-jobs')
+    _inline_pool.submit(run_job_inline, job_id)
+
+
+def enqueue(kind, key, payload=None):
+    """
+    Queue a job unless the same (kind, key) is already queued or running;
+    a finished or failed job with that key is queued again
+
+    Returns:
+        BackgroundJob: The job row
+    """
+    job, created = BackgroundJob.objects.get_or_create(kind=kind, key=str(key), defaults={'payload': payload or {}})
+    if not created and job.status in ('done', 'failed'):
+        requeued = BackgroundJob.objects.filter(id=job.id, status__in=['done', 'failed']).update(
+            status='queued', payload=payload or {}, attempts=0, run_after=timezone.now(),
+            locked_at=None, last_error='', finished_at=None,
+        )
+        if requeued:
+            job.refresh_from_db()
+    if _run_inline() and job.status == 'queued':
+        transaction.on_commit(lambda: _submit_inline(job.id))
+    return job
+
+
+def enqueue_student_analysis(participant):
+    return enqueue(STUDENT_ANALYSIS, participant.id, {'participant_id': participant.id})
+
+
+def job_status(kind, key):
+    """Status of a job, or None if it was never queued"""
+    return BackgroundJob.objects.filter(kind=kind, key=str(key)).values_list('status', flat=True).first()
+
+
+def claim_jobs(limit):
+    """
+    Claim up to `limit` due jobs for this worker
+
+    Returns:
+        list: Claimed BackgroundJob rows (status 'running', attempts incremented)
+    """
+    now = timezone.now()
+    due = Q(status='queued', run_after__lte=now) | Q(status='running', locked_at__lt=now - _lock_timeout())
+    candidates = BackgroundJob.objects.filter(due).order_by('run_after').values_list('id', 'status')[:limit]
+
+    claimed = []
+    for job_id, status in candidates:
+        # Another worker may have claimed it since the SELECT; only one UPDATE matches
+        won = BackgroundJob.objects.filter(due, id=job_id, status=status).update(
+            status='running', locked_at=now, attempts=F('attempts') + 1,
+        )
+        if won:
+            claimed.append(job_id)
+    return list(BackgroundJob.objects.filter(id__in=claimed))
+
+
+def run_job(job):
+    """
+    Run one claimed job and record the outcome
+
+    Returns:
+        bool: True if the handler succeeded
+    """
+    close_old_connections()
+    try:
+        return _execute(job)
+    finally:
+        close_old_connections()
+
+
+def run_job_inline(job_id):
+    """
+    Claim and run a queued job on an inline pool thread. There is no worker
+    to retry it later, so a failure is final.
+    """
+    try:
+        claimed = BackgroundJob.objects.filter(id=job_id, status='queued').update(
+            status='running', locked_at=timezone.now(), attempts=F('attempts') + 1,
+        )
+        if claimed:
+            _execute(BackgroundJob.objects.get(id=job_id), retry=False)
+    finally:
+        # The pool thread owns its own DB connection
+        connection.close()
+
+
+def _execute(job, retry=True):
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f'No handler for job kind {job.kind}')
+        handler(job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if retry and job.attempts < _max_attempts():
+            backoff = _retry_seconds() * 2 ** (job.attempts - 1)
+            BackgroundJob.objects.filter(id=job.id).update(
+                status='queued', locked_at=None, last_error=error,
+                run_after=timezone.now() + timedelta(seconds=backoff),
+            )
+        else:
+            BackgroundJob.objects.filter(id=job.id).update(
+                status='failed', locked_at=None, last_error=error, finished_at=timezone.now(),
+            )
+        return False
+    else:
+        BackgroundJob.objects.filter(id=job.id).update(
+            status='done', locked_at=None, last_error='', finished_at=timezone.now(),
+        )
+        return True
@@ -0,0 +1,236 @@
+"""
+Course, global and live-quiz leaderboards kept as order-statistics structures
+
+Each board is a sorted list of (-score, tiebreak, member) keys maintained with
+bisect, so a score change, a rank lookup and a top-N slice never re-sort the
+board. Boards live in-process (the LEADERBOARD_CACHE_SIZE most recently used
+ones) and are built from the database on first use; every score change
+bumps a per-board version in the cache, and a process whose board is behind
+that version rebuilds it on next access. That reaches other processes only
+through a shared cache (REDIS_URL). With the per-process default, a worker
+sees only the score changes it made itself, and its boards stay stale until
+they are evicted or the process restarts.
+
+Boards:
+    course:<id>   users by completed content in the course (earliest to finish first)
+    global        users by completed content across all courses
+    quiz:<id>     submitted participants of a live quiz by score (earliest submission first)
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Content, QuizParticipant, UserProgress
+
+GLOBAL_BOARD = 'global'
+
+
+def course_board_name(course_id):
+    return f'course:{course_id}'
+
+
+def quiz_board_name(quiz_id):
+    return f'quiz:{quiz_id}'
+
+
+class Leaderboard:
+    """Members ordered by score (descending), ties broken by a smaller tiebreak first"""
+
+    def __init__(self, entries=()):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._by_member = {}
+        for member, score, tiebreak in entries:
+            key = (-score, tiebreak, member)
+            self._keys.append(key)
+            self._by_member[member] = key
+        self._keys.sort()
+
+    def _discard(self, member):
+        key = self._by_member.pop(member, None)
+        if key is not None:
+            del self._keys[bisect_left(self._keys, key)]
+
+    def update(self, member, score, tiebreak=0.0):
+        """Insert a member or move it to its new score"""
+        key = (-score, tiebreak, member)
+        with self._lock:
+            self._discard(member)
+            insort(self._keys, key)
+            self._by_member[member] = key
+
+    def remove(self, member):
+        with self._lock:
+            self._discard(member)
+
+    def rank(self, member):
+        """
+        1-based competition rank (members with equal scores share a rank)
+
+        Returns:
+            dict: rank, score and total members, or None if the member is not on the board
+        """
+        with self._lock:
+            key = self._by_member.get(member)
+            if key is None:
+                return None
+            return {
+                'rank': bisect_left(self._keys, (key[0],)) + 1,
+                'score': -key[0],
+                'total': len(self._keys),
+            }
+
+    def top(self, n):
+        """The first n (member, score, rank) entries"""
+        with self._lock:
+            keys = self._keys[:n]
+            entries = []
+            for position, (negative_score, _, member) in enumerate(keys):
+                if position and negative_score == keys[position - 1][0]:
+                    rank = entries[-1][2]
+                else:
+                    rank = position + 1
+                entries.append((member, -negative_score, rank))
+            return entries
+
+    def __len__(self):
+        return len(self._keys)
+
+
+_boards = OrderedDict()  # name -> (version, Leaderboard), least recently used first
+_boards_lock = threading.Lock()
+
+
+def _max_boards():
+    return getattr(settings, 'LEADERBOARD_CACHE_SIZE', 200)
+
+
+def _store_board(name, version, board):
+    """Keep a board as the most recently used one, evicting the least recently used (call with the lock held)"""
+    _boards[name] = (version, board)
+    _boards.move_to_end(name)
+    while len(_boards) > _max_boards():
+        _boards.popitem(last=False)
+
+
+def _version_key(name):
+    return f'leaderboard:{name}:version'
+
+
+def _timestamp(value):
+    return value.timestamp() if value else 0.0
+
+
+def _load_progress_entries(course_id=None):
+    rows = UserProgress.objects.filter(completed=True)
+    if course_id is not None:
+        rows = rows.filter(content__course_id=course_id)
+    rows = rows.values('user_id').annotate(completed=Count('id'), last=Max('completed_at'))
+    return [(row['user_id'], row['completed'], _timestamp(row['last'])) for row in rows]
+
+
+def _load_quiz_entries(quiz_id):
+    rows = QuizParticipant.objects.filter(quiz_id=quiz_id, submitted_at__isnull=False).values_list(
+        'id', 'score', 'submitted_at'
+    )
+    return [(participant_id, score, _timestamp(submitted_at)) for participant_id, score, submitted_at in rows]
+
+
+def _get_board(name, loader):
+    version = cache.get(_version_key(name), 0)
+    with _boards_lock:
+        loaded = _boards.get(name)
+        if loaded is not None and loaded[0] == version:
+            _boards.move_to_end(name)
+            return loaded[1]
+
+    board = Leaderboard(loader())
+    with _boards_lock:
+        _store_board(name, version, board)
+    return board
+
+
+def _changed(name, apply):
+    """
+    Apply a score change to this process's board (if loaded) and bump the
+    shared version so other processes rebuild theirs. If another process
+    changed the board meanwhile, the local copy is dropped instead.
+    """
+    key = _version_key(name)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        version = cache.incr(key)
+
+    with _boards_lock:
+        loaded = _boards.get(name)
+        if loaded is None:
+            return
+        if loaded[0] + 1 != version:
+            del _boards[name]
+            return
+        apply(loaded[1])
+        _store_board(name, version, loaded[1])
+
+
+def course_leaderboard(course_id):
+    return _get_board(course_board_name(course_id), lambda: _load_progress_entries(course_id))
+
+
+def global_leaderboard():
+    return _get_board(GLOBAL_BOARD, _load_progress_entries)
+
+
+def quiz_leaderboard(quiz_id):
+    return _get_board(quiz_board_name(quiz_id), lambda: _load_quiz_entries(quiz_id))
+
+
+def _set_progress_score(name, user_id, completed, last):
+    def apply(board):
+        if completed:
+            board.update(user_id, completed, _timestamp(last))
+        else:
+            board.remove(user_id)
+    _changed(name, apply)
+
+
+def refresh_progress_scores(user_id, content_ids):
+    """
+    Recompute a user's completed counts for the courses of the given content
+    items, and their global total, and move them on the affected boards
+    """
+    course_ids = set(Content.objects.filter(id__in=content_ids).values_list('course_id', flat=True))
+    rows = (
+        UserProgress.objects.filter(user_id=user_id, completed=True)
+        .values('content__course_id')
+        .annotate(completed=Count('id'), last=Max('completed_at'))
+    )
+    per_course = {row['content__course_id']: (row['completed'], row['last']) for row in rows}
+
+    for course_id in course_ids:
+        completed, last = per_course.get(course_id, (0, None))
+        _set_progress_score(course_board_name(course_id), user_id, completed, last)
+
+    times = [last for _, last in per_course.values() if last]
+    _set_progress_score(
+        GLOBAL_BOARD, user_id, sum(completed for completed, _ in per_course.values()), max(times) if times else None,
+    )
+
+
+def record_progress_change(user_id, content_ids):
+    """Refresh the user's progress scores once the current transaction commits"""
+    content_ids = list(content_ids)
+    transaction.on_commit(lambda: refresh_progress_scores(user_id, content_ids))
+
+
+def record_quiz_submission(participant):
+    """Place a submitted participant on their quiz's board once the transaction commits"""
+    name = quiz_board_name(participant.quiz_id)
+    member, score, tiebreak = participant.id, participant.score, _timestamp(participant.submitted_at)
+    transaction.on_commit(lambda: _changed(name, lambda board: board.update(member, score, tiebreak)))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from learning_app.archive import archive_directory, archive_events
+
+
+class Command(BaseCommand):
+    help = 'Move clickstream events older than the retention window into compressed monthly archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CLICKSTREAM_RETENTION_DAYS,
+                            help='Keep this many days of events in the database')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Events archived and purged per batch')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(f'Archiving events before {cutoff:%Y-%m-%d %H:%M} to {archive_directory()}')
+
+        archived = archive_events(cutoff, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} events'))
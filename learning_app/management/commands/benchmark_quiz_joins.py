@@ -0,0 +1,76 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+
+from learning_app.models import LiveQuiz, QuizParticipant, QuizQuestion, TeacherProfile
+from learning_app.quiz_join import join_quiz_code
+
+
+def _baseline_join(quiz_code, student_name, student_email):
+    # The join path before the cached code map and upsert
+    quiz = LiveQuiz.objects.get(quiz_code=quiz_code, status='active')
+    participant, created = QuizParticipant.objects.get_or_create(
+        quiz=quiz,
+        student_email=student_email,
+        defaults={'student_name': student_name, 'total_questions': quiz.questions.count()},
+    )
+    return quiz.id, participant.id, created
+
+
+class Command(BaseCommand):
+    help = 'Measure how many quiz joins per second the database sustains under a burst of concurrent students'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help='Distinct students joining')
+        parser.add_argument('--threads', type=int, default=16, help='Joins in flight at once')
+        parser.add_argument('--baseline', action='store_true', help='Use the old get / get_or_create join path')
+
+    def handle(self, *args, **options):
+        join = _baseline_join if options['baseline'] else join_quiz_code
+        students = options['students']
+        run_id = uuid.uuid4().hex[:8]
+
+        user = User.objects.create_user(username=f'join-benchmark-{run_id}')
+        teacher = TeacherProfile.objects.create(user=user, email=f'join-benchmark-{run_id}@example.com')
+        quiz = LiveQuiz.objects.create(teacher=teacher, title='Join benchmark', status='active')
+        QuizQuestion.objects.create(
+            quiz=quiz, question_text='2 + 2?', option_a='3', option_b='4', correct_answer='B', approval_status='approved',
+        )
+
+        def run(index):
+            started = time.perf_counter()
+            try:
+                join(quiz.quiz_code, f'Student {index}', f'student{index}@{run_id}.example.com')
+                return time.perf_counter() - started, None
+            except OperationalError as e:
+                return time.perf_counter() - started, str(e)
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(options['threads'], 1)) as pool:
+                results = list(pool.map(run, range(students)))
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(latency for latency, _ in results)
+            errors = [error for _, error in results if error]
+            joined = QuizParticipant.objects.filter(quiz=quiz).count()
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Baseline' if options['baseline'] else 'Upsert'} join path: "
+                f"{joined}/{students} students joined in {elapsed:.2f}s ({joined / elapsed:.0f} joins/s)"
+            ))
+            self.stdout.write(
+                f'Latency p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, '
+                f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms, '
+                f'max {latencies[-1] * 1000:.1f}ms'
+            )
+            if errors:
+                self.stdout.write(self.style.ERROR(f'{len(errors)} joins failed, e.g. {errors[0]}'))
+        finally:
+            user.delete()
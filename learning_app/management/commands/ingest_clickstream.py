@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from learning_app.clickstream import ingest_spool
+
+
+class Command(BaseCommand):
+    help = 'Load spooled clickstream segments into the ClickstreamEvent table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Ingest what is spooled now and exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep between passes')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events per INSERT transaction')
+        parser.add_argument('--directory', default=settings.CLICKSTREAM_SPOOL_DIR, help='Spool directory')
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        # Open segments older than this belong to workers that died without sealing them
+        stale_after = settings.CLICKSTREAM_SPOOL_MAX_AGE * 2 + 60
+
+        self.stdout.write(self.style.SUCCESS(f'Ingesting clickstream spool from {directory}'))
+
+        try:
+            while True:
+                ingested = ingest_spool(directory, batch_size=options['batch_size'], stale_after=stale_after)
+                if ingested:
+                    self.stdout.write(f'Ingested {ingested} events')
+
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping ingestion')
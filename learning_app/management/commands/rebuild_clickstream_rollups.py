@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from learning_app.rollups import rebuild_rollups
+from learning_app.utils import parse_datetime_param
+
+
+class Command(BaseCommand):
+    help = 'Recompute clickstream minute/hour rollups from the raw event table (run with ingestion paused)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Start date or datetime (ISO 8601); defaults to the oldest event')
+        parser.add_argument('--until', help='End date or datetime (ISO 8601); defaults to the newest event')
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_datetime_param(options['since'])
+            end = parse_datetime_param(options['until'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write('Rebuilding clickstream rollups...')
+        total = rebuild_rollups(start=start, end=end)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {total} events'))
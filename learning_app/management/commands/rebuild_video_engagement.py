@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from learning_app.engagement import rebuild_engagement
+from learning_app.models import Content
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-second video engagement curves from stored watched intervals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--content', type=int, help='Only rebuild this Content id')
+
+    def handle(self, *args, **options):
+        videos = Content.objects.filter(content_type='video')
+        if options['content']:
+            videos = videos.filter(id=options['content'])
+
+        for content in videos:
+            users = rebuild_engagement(content)
+            self.stdout.write(f'{content.title}: {users} viewers')
+
+        self.stdout.write(self.style.SUCCESS('Engagement curves rebuilt'))
@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from learning_app.jobs import claim_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (student analyses) on a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run concurrently')
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due now and exit')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when no job is due')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        self.stdout.write(self.style.SUCCESS(f'Running background jobs with {workers} workers'))
+
+        running = set()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                while True:
+                    # Only claim as many jobs as there are free workers, so idle workers elsewhere can take the rest
+                    free = workers - len(running)
+                    jobs = claim_jobs(free) if free else []
+                    for job in jobs:
+                        running.add(pool.submit(self._run, job))
+
+                    if options['once'] and free and not jobs:
+                        wait(running)
+                        break
+                    if running:
+                        _, running = wait(running, timeout=options['interval'], return_when=FIRST_COMPLETED)
+                    elif not jobs:
+                        time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping job worker')
+
+    def _run(self, job):
+        succeeded = run_job(job)
+        status = 'done' if succeeded else 'failed (will retry if attempts remain)'
+        self.stdout.write(f'{job.kind}:{job.key} attempt {job.attempts} {status}')
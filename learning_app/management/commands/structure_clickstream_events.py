@@ -0,0 +1,115 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from learning_app.models import ClickstreamEvent, Content, Course
+
+# Legacy description formats written by the views before events carried payloads.
+# Each pattern may capture `title` (a Content title) plus payload fields.
+USER = r'User .+? \(.*?\) '
+LEGACY_PATTERNS = [
+    ('video_play', re.compile(rf'^{USER}started playing video: (?P<title>.+) at (?P<current_time>-?[\d.]+)s$')),
+    ('video_pause', re.compile(rf'^{USER}paused video: (?P<title>.+) at (?P<current_time>-?[\d.]+)s$')),
+    ('video_complete', re.compile(rf'^{USER}completed video: (?P<title>.+)$')),
+    ('quiz_submit', re.compile(
+        rf'^{USER}submitted quiz for (?P<title>.+)\. Answer: (?P<answer>.*?), '
+        r'Correct: (?P<correct>True|False), Score: (?P<score>\d+)$'
+    )),
+    ('text_read', re.compile(rf'^{USER}marked text content as read: (?P<title>.+)$')),
+    ('page_view', re.compile(rf'^(?:{USER}|User )viewed (?:video|text|quiz): (?P<title>.+)$')),
+    ('page_view', re.compile(r'^User viewed course: (?P<course>.+)$')),
+    ('page_view', re.compile(r'^User viewed page: (?P<path>\S+)$')),
+    # Fully implied by event_name/component/user, nothing to keep
+    (None, re.compile(
+        r'^(User viewed the (homepage|registration page|login page|dashboard|analytics page)'
+        r'|User viewed analytics page'
+        r'|User .+ logged in successfully \(demo mode\)'
+        r'|User .* logged out'
+        r'|New user registered with username: .+)$'
+    )),
+]
+
+
+def structure_event(event, content_ids, course_ids):
+    """
+    Move a legacy description into content/payload
+
+    Returns:
+        bool: True if the event was converted
+    """
+    for event_name, pattern in LEGACY_PATTERNS:
+        if event_name and event_name != event.event_name:
+            continue
+        match = pattern.match(event.description)
+        if not match:
+            continue
+
+        fields = match.groupdict()
+        payload = {}
+        if 'title' in fields:
+            content_id = content_ids.get(fields.pop('title'))
+            if content_id is None:
+                # Content was renamed or deleted; keep the original text
+                return False
+            event.content_id = content_id
+        if 'course' in fields:
+            course_id = course_ids.get(fields.pop('course'))
+            if course_id is None:
+                return False
+            payload['course_id'] = course_id
+        if 'current_time' in fields:
+            current_time = float(fields.pop('current_time'))
+            payload['current_time'] = int(current_time) if current_time.is_integer() else current_time
+        if 'correct' in fields:
+            payload['correct'] = fields.pop('correct') == 'True'
+        if 'score' in fields:
+            payload['score'] = int(fields.pop('score'))
+        payload.update(fields)
+
+        event.payload = {**(event.payload or {}), **payload}
+        event.description = ''
+        return True
+    return False
+
+
+class Command(BaseCommand):
+    help = 'Convert legacy free-text clickstream descriptions into structured content/payload fields'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Events updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        content_ids = {}
+        for content_id, title in Content.objects.order_by('-id').values_list('id', 'title'):
+            # Titles are not unique; the oldest content with a title wins
+            content_ids[title] = content_id
+        course_ids = {}
+        for course_id, title in Course.objects.order_by('-id').values_list('id', 'title'):
+            course_ids[title] = course_id
+
+        converted = skipped = 0
+        last_id = 0
+        while True:
+            batch = list(
+                ClickstreamEvent.objects.filter(id__gt=last_id)
+                .exclude(description='')
+                .order_by('id')
+                .only('id', 'event_name', 'description', 'payload', 'content_id')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            changed = [event for event in batch if structure_event(event, content_ids, course_ids)]
+            with transaction.atomic():
+                ClickstreamEvent.objects.bulk_update(changed, ['content', 'payload', 'description'])
+
+            converted += len(changed)
+            skipped += len(batch) - len(changed)
+            self.stdout.write(f'Processed events up to id {last_id}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Structured {converted} events; left {skipped} unrecognised descriptions unchanged'
+        ))
@@ -1,45 +1,90 @@
+import random
+import re
+import time
+
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from .utils import log_clickstream_event
 
 
+def compile_path_rules(sample_rates, default_rate=1.0):
+    """
+    Build a path classifier from {prefix: sample_rate}
+
+    Prefixes starting with '=' match the path exactly. All rules are folded into
+    one regex (longest prefix first), so classifying a path is a single match
+    instead of a loop over prefix lists.
+
+    Returns:
+        callable: path -> sample rate between 0 (never log) and 1 (always log)
+    """
+    rules = sorted(sample_rates.items(), key=lambda item: len(item[0].lstrip('=')), reverse=True)
+    rates = [float(rate) for _, rate in rules]
+
+    alternatives = []
+    for i, (prefix, _) in enumerate(rules):
+        if prefix.startswith('='):
+            alternatives.append(f'(?P<r{i}>{re.escape(prefix[1:])}$)')
+        else:
+            alternatives.append(f'(?P<r{i}>{re.escape(prefix)})')
+
+    if not alternatives:
+        return lambda path: default_rate
+
+    pattern = re.compile('^(?:' + '|'.join(alternatives) + ')')
+
+    def classify(path):
+        match = pattern.match(path)
+        if match is None:
+            return default_rate
+        return rates[int(match.lastgroup[1:])]
+
+    return classify
+
+
 class ClickstreamMiddleware(MiddlewareMixin):
     """
-    Middleware to automatically track user clicks and page views
+    Middleware to automatically track page views.
+
+    Paths are classified once by a precompiled table of sample rates; sampled
+    GET requests are timed and handed to the clickstream sink, which never
+    writes to the database on the request thread. Only HTML responses count
+    as page views, so JSON polling endpoints and event streams are not logged.
     """
-    
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.classify = compile_path_rules(
+            getattr(settings, 'CLICKSTREAM_SAMPLE_RATES', {}),
+            getattr(settings, 'CLICKSTREAM_DEFAULT_SAMPLE_RATE', 1.0),
+        )
+
     def process_request(self, request):
-        """Process each request to log basic page view events"""
-        # Skip tracking for admin, static files, and API endpoints that we handle manually
-        skip_paths = [
-            '/admin/',
-            '/static/',
-            '/media/',
-            '/track-video/',
-            '/submit-quiz/',
-        ]
-        
-        # Check if we should skip this path
-        for skip_path in skip_paths:
-            if request.path.startswith(skip_path):
-                return None
-        
-        # Log page view for GET requests only (not form submissions)
-        if request.method == 'GET':
-            # Don't log if we're already logging this in the view
-            manual_log_paths = [
-                '/',
-                '/login/',
-                '/register/',
-                '/dashboard/',
-                '/analytics/',
-            ]
-            
-            if not any(request.path.startswith(path) for path in manual_log_paths):
-                log_clickstream_event(
-                    request=request,
-                    event_name='page_view',
-                    component='Page',
-                    description=f'User viewed page: {request.path}'
-                )
-        
-        return None 
\ No newline at end of file
+        """Decide up front whether this request is tracked and start its timer"""
+        # Log page views for GET requests only (not form submissions)
+        if request.method != 'GET':
+            return None
+
+        rate = self.classify(request.path)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+
+        request._clickstream_started = time.perf_counter()
+        return None
+
+    def process_response(self, request, response):
+        """Log the sampled page view with its duration"""
+        started = getattr(request, '_clickstream_started', None)
+        if started is None or not response.get('Content-Type', '').startswith('text/html'):
+            return response
+
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        log_clickstream_event(
+            request=request,
+            event_name='page_view',
+            component='Page',
+            duration_ms=duration_ms,
+            payload={'path': request.path, 'status': response.status_code},
+        )
+
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0008_pollanalytics_word_cloud_data_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clickstreamevent',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0010_clickstreamspoolcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClickstreamRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('bucket', models.DateTimeField(help_text='Start of the UTC minute or hour')),
+                ('event_name', models.CharField(max_length=50)),
+                ('component', models.CharField(max_length=100)),
+                ('user_id', models.IntegerField(default=0, help_text='0 for anonymous events')),
+                ('event_count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('granularity', 'bucket', 'event_name', 'component', 'user_id')},
+            },
+        ),
+    ]
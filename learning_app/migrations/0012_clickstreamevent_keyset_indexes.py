@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0011_clickstreamrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clickstreamevent',
+            index=models.Index(fields=['timestamp', 'id'], name='click_ts_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clickstreamevent',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='click_user_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clickstreamevent',
+            index=models.Index(fields=['event_name', 'timestamp', 'id'], name='click_event_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clickstreamevent',
+            index=models.Index(fields=['component', 'timestamp', 'id'], name='click_component_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clickstreamevent',
+            index=models.Index(fields=['session_id', 'timestamp', 'id'], name='click_session_ts_idx'),
+        ),
+    ]
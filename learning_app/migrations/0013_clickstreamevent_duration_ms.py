@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0012_clickstreamevent_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clickstreamevent',
+            name='duration_ms',
+            field=models.PositiveIntegerField(blank=True, help_text='Server time to handle the request', null=True),
+        ),
+    ]
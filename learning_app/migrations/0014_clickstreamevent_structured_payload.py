@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0013_clickstreamevent_duration_ms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clickstreamevent',
+            name='content',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='clickstream_events', to='learning_app.content'),
+        ),
+        migrations.AddField(
+            model_name='clickstreamevent',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, help_text='Event details such as current_time, answer or score'),
+        ),
+        migrations.AlterField(
+            model_name='clickstreamevent',
+            name='description',
+            field=models.TextField(blank=True, help_text='Legacy free-text description; new events use payload'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+DIMENSION_FIELDS = ['event_context', 'component', 'user_agent', 'url', 'referrer']
+
+
+def encode_existing_events(apps, schema_editor):
+    ClickstreamEvent = apps.get_model('learning_app', 'ClickstreamEvent')
+    ClickstreamDimension = apps.get_model('learning_app', 'ClickstreamDimension')
+
+    for field in DIMENSION_FIELDS:
+        values = ClickstreamEvent.objects.order_by().values_list(field, flat=True).distinct()
+        for value in values:
+            if not value:
+                continue
+            dimension, _ = ClickstreamDimension.objects.get_or_create(kind=field, value=value)
+            ClickstreamEvent.objects.filter(**{field: value}).update(**{f'{field}_ref': dimension})
+
+
+def decode_events(apps, schema_editor):
+    ClickstreamEvent = apps.get_model('learning_app', 'ClickstreamEvent')
+
+    for field in DIMENSION_FIELDS:
+        for event in ClickstreamEvent.objects.filter(**{f'{field}_ref__isnull': False}).select_related(f'{field}_ref'):
+            setattr(event, field, getattr(event, f'{field}_ref').value)
+            event.save(update_fields=[field])
+
+
+def dimension_fk():
+    return models.ForeignKey(
+        blank=True,
+        null=True,
+        on_delete=django.db.models.deletion.PROTECT,
+        related_name='+',
+        to='learning_app.clickstreamdimension',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0014_clickstreamevent_structured_payload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClickstreamDimension',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('event_context', 'Event Context'), ('component', 'Component'), ('user_agent', 'User Agent'), ('url', 'URL'), ('referrer', 'Referrer')], max_length=20)),
+                ('value', models.TextField()),
+            ],
+            options={
+                'unique_together': {('kind', 'value')},
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='clickstreamevent',
+            name='click_component_ts_idx',
+        ),
+        *[
+            migrations.AddField(model_name='clickstreamevent', name=f'{field}_ref', field=dimension_fk())
+            for field in DIMENSION_FIELDS
+        ],
+        # Nullable first so the reverse migration can re-add the string columns
+        # empty and let decode_events fill them before they become required again
+        migrations.AlterField(
+            model_name='clickstreamevent',
+            name='event_context',
+            field=models.CharField(default='Learning Platform', max_length=500, null=True),
+        ),
+        migrations.AlterField(
+            model_name='clickstreamevent',
+            name='component',
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='clickstreamevent',
+            name='user_agent',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='clickstreamevent',
+            name='url',
+            field=models.URLField(max_length=500, null=True),
+        ),
+        migrations.RunPython(encode_existing_events, decode_events),
+        *[
+            migrations.RemoveField(model_name='clickstreamevent', name=field)
+            for field in DIMENSION_FIELDS
+        ],
+        *[
+            migrations.RenameField(model_name='clickstreamevent', old_name=f'{field}_ref', new_name=field)
+            for field in DIMENSION_FIELDS
+        ],
+        migrations.AddIndex(
+            model_name='clickstreamevent',
+            index=models.Index(fields=['component', 'timestamp', 'id'], name='click_component_ts_idx'),
+        ),
+    ]
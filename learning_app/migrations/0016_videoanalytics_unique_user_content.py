@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def merge_duplicate_rows(apps, schema_editor):
+    """Collapse duplicate (user, content) rows into the newest one before adding the unique key"""
+    VideoAnalytics = apps.get_model('learning_app', 'VideoAnalytics')
+
+    duplicates = (
+        VideoAnalytics.objects.values('user_id', 'content_id')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+    )
+    for key in duplicates:
+        rows = list(VideoAnalytics.objects.filter(user_id=key['user_id'], content_id=key['content_id']).order_by('id'))
+        keep = rows[-1]
+        keep.play_timestamp = min(row.play_timestamp for row in rows)
+        pauses = [row.pause_timestamp for row in rows if row.pause_timestamp]
+        keep.pause_timestamp = max(pauses) if pauses else None
+        keep.total_watched = max(row.total_watched for row in rows)
+        keep.completed = any(row.completed for row in rows)
+        keep.save()
+        VideoAnalytics.objects.filter(id__in=[row.id for row in rows[:-1]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0015_clickstreamdimension_encode_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rows, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='videoanalytics',
+            unique_together={('user', 'content')},
+        ),
+    ]
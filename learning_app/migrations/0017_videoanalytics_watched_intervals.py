@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0016_videoanalytics_unique_user_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoanalytics',
+            name='watched_intervals',
+            field=models.BinaryField(blank=True, default=b'', help_text='Packed [start, end) second ranges watched (see video_positions.WatchedIntervals)'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0017_videoanalytics_watched_intervals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoEngagement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.BinaryField(default=b'', help_text='Packed uint32 per second: times watched, including rewatches')),
+                ('viewers', models.BinaryField(default=b'', help_text='Packed uint32 per second: distinct users who watched it')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='engagement', to='learning_app.content')),
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:09
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def backfill_running_analytics(apps, schema_editor):
+    """Seed the running counters from answers already submitted"""
+    LiveQuiz = apps.get_model('learning_app', 'LiveQuiz')
+    QuizAnalytics = apps.get_model('learning_app', 'QuizAnalytics')
+    QuizAnswer = apps.get_model('learning_app', 'QuizAnswer')
+    QuizQuestionStats = apps.get_model('learning_app', 'QuizQuestionStats')
+
+    quizzes = LiveQuiz.objects.annotate(
+        submitted=Count('participants', filter=Q(participants__submitted_at__isnull=False)),
+        score_total=Sum('participants__score', filter=Q(participants__submitted_at__isnull=False)),
+    ).filter(submitted__gt=0)
+    for quiz in quizzes:
+        QuizAnalytics.objects.update_or_create(
+            quiz=quiz,
+            defaults={'total_participants': quiz.submitted, 'score_sum': quiz.score_total or 0},
+        )
+
+    stats = {}
+    rows = QuizAnswer.objects.values_list('question_id', 'selected_answer', 'is_correct').annotate(answers=Count('id')).order_by()
+    for question_id, selected_answer, is_correct, answers in rows:
+        row = stats.setdefault(question_id, QuizQuestionStats(question_id=question_id))
+        row.answered += answers
+        if is_correct:
+            row.correct += answers
+        elif selected_answer in ('A', 'B', 'C', 'D'):
+            field = f'wrong_{selected_answer.lower()}'
+            setattr(row, field, getattr(row, field) + answers)
+    QuizQuestionStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0019_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizanalytics',
+            name='score_sum',
+            field=models.BigIntegerField(default=0, help_text='Running sum of submitted scores'),
+        ),
+        migrations.CreateModel(
+            name='QuizQuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answered', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('wrong_a', models.PositiveIntegerField(default=0)),
+                ('wrong_b', models.PositiveIntegerField(default=0)),
+                ('wrong_c', models.PositiveIntegerField(default=0)),
+                ('wrong_d', models.PositiveIntegerField(default=0)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='learning_app.quizquestion')),
+            ],
+        ),
+        migrations.RunPython(backfill_running_analytics, migrations.RunPython.noop),
+    ]
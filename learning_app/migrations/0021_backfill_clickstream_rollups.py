@@ -0,0 +1,47 @@
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncHour, TruncMinute
+
+
+def backfill_rollups(apps, schema_editor):
+    """Recompute the minute/hour rollups from every event recorded so far"""
+    ClickstreamEvent = apps.get_model('learning_app', 'ClickstreamEvent')
+    ClickstreamRollup = apps.get_model('learning_app', 'ClickstreamRollup')
+
+    counts = Counter()
+    for granularity, trunc in (('minute', TruncMinute), ('hour', TruncHour)):
+        grouped = (
+            ClickstreamEvent.objects.order_by()
+            .annotate(bucket=trunc('timestamp'))
+            .values('bucket', 'event_name', 'component__value', 'user_id')
+            .annotate(count=Count('id'))
+        )
+        for row in grouped.iterator():
+            counts[(
+                granularity, row['bucket'], row['event_name'], row['component__value'] or '', row['user_id'] or 0,
+            )] += row['count']
+
+    ClickstreamRollup.objects.all().delete()
+    ClickstreamRollup.objects.bulk_create(
+        [
+            ClickstreamRollup(
+                granularity=granularity, bucket=bucket, event_name=event_name,
+                component=component, user_id=user_id, event_count=count,
+            )
+            for (granularity, bucket, event_name, component, user_id), count in counts.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_app', '0020_quiz_running_analytics'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -66,6 +66,32 @@ class UserProgress(models.Model):
         return f"{self.user.username} - {self.content.title} - {'Completed' if self.completed else 'In Progress'}"
 
 
+class ClickstreamDimension(models.Model):
+    """One distinct clickstream string (a component name, URL, user agent, ...)"""
+    KINDS = [
+        ('event_context', 'Event Context'),
+        ('component', 'Component'),
+        ('user_agent', 'User Agent'),
+        ('url', 'URL'),
+        ('referrer', 'Referrer'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KINDS)
+    value = models.TextField()
+    
+    class Meta:
+        unique_together = ['kind', 'value']
+    
+    def __str__(self):
+        return self.value
+
+
+class _MissingAsPlaceholder(dict):
+    """format_map helper that renders absent payload keys as a '?' placeholder"""
+    def __missing__(self, key):
+        return '?'
+
+
 class ClickstreamEvent(models.Model):
     EVENT_TYPES = [
         ('page_view', 'Page View'),
@@ -81,25 +107,100 @@ class ClickstreamEvent(models.Model):
         ('registration', 'Registration'),
     ]
     
+    # Human-readable descriptions are rendered from these when displayed
+    DESCRIPTION_FORMATS = {
+        'page_view': 'viewed {target}',
+        'click': 'clicked {target}',
+        'video_play': 'started playing video: {content} at {current_time}s',
+        'video_pause': 'paused video: {content} at {current_time}s',
+        'video_complete': 'completed video: {content}',
+        'quiz_submit': 'submitted quiz for {content}. Answer: {answer}, Correct: {correct}, Score: {score}',
+        'text_read': 'marked text content as read: {content}',
+        'login': 'logged in',
+        'logout': 'logged out',
+        'registration': 'registered',
+    }
+    
+    # Repetitive strings stored once in ClickstreamDimension and referenced by id
+    DIMENSION_FIELDS = ['event_context', 'component', 'user_agent', 'url', 'referrer']
+    
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
-    event_context = models.CharField(max_length=500, default="Learning Platform")
-    component = models.CharField(max_length=100)
+    # Set when the event is captured, not when the batched writer inserts it
+    timestamp = models.DateTimeField(default=timezone.now)
+    event_context = models.ForeignKey('ClickstreamDimension', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    component = models.ForeignKey('ClickstreamDimension', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     event_name = models.CharField(max_length=50, choices=EVENT_TYPES)
-    description = models.TextField()
+    content = models.ForeignKey('Content', on_delete=models.SET_NULL, null=True, blank=True, related_name='clickstream_events')
+    payload = models.JSONField(default=dict, blank=True, help_text="Event details such as current_time, answer or score")
+    description = models.TextField(blank=True, help_text="Legacy free-text description; new events use payload")
     origin = models.CharField(max_length=10, default="web")
     ip_address = models.GenericIPAddressField()
-    user_agent = models.TextField(blank=True)
-    url = models.URLField(max_length=500)
-    referrer = models.URLField(max_length=500, blank=True, null=True)
+    user_agent = models.ForeignKey('ClickstreamDimension', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    url = models.ForeignKey('ClickstreamDimension', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    referrer = models.ForeignKey('ClickstreamDimension', on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     session_id = models.CharField(max_length=100, blank=True)
+    duration_ms = models.PositiveIntegerField(null=True, blank=True, help_text="Server time to handle the request")
     
     class Meta:
         ordering = ['-timestamp']
+        # Keyset pagination walks (timestamp, id); each filter gets its own prefix
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='click_ts_id_idx'),
+            models.Index(fields=['user', 'timestamp', 'id'], name='click_user_ts_idx'),
+            models.Index(fields=['event_name', 'timestamp', 'id'], name='click_event_ts_idx'),
+            models.Index(fields=['component', 'timestamp', 'id'], name='click_component_ts_idx'),
+            models.Index(fields=['session_id', 'timestamp', 'id'], name='click_session_ts_idx'),
+        ]
     
     def __str__(self):
         username = self.user.username if self.user else "Anonymous"
         return f"{username} - {self.event_name} - {self.timestamp}"
+    
+    def get_description(self):
+        """Render the human-readable description from the structured fields"""
+        if self.description:
+            return self.description
+        
+        details = dict(self.payload or {})
+        content_title = self.content.title if self.content_id and self.content else ''
+        details.setdefault('content', content_title or 'unknown content')
+        details.setdefault('target', content_title or details.get('path') or str(self.component or 'a page'))
+        
+        template = self.DESCRIPTION_FORMATS.get(self.event_name, self.event_name.replace('_', ' '))
+        action = template.format_map(_MissingAsPlaceholder(details))
+        username = self.user.username if self.user else "Anonymous user"
+        return f"{username} {action}"
+
+
+class ClickstreamRollup(models.Model):
+    """Event counts per minute or hour bucket, kept up to date as events are written"""
+    GRANULARITIES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+    ]
+    
+    granularity = models.CharField(max_length=10, choices=GRANULARITIES)
+    bucket = models.DateTimeField(help_text="Start of the UTC minute or hour")
+    event_name = models.CharField(max_length=50)
+    component = models.CharField(max_length=100)
+    user_id = models.IntegerField(default=0, help_text="0 for anonymous events")
+    event_count = models.BigIntegerField(default=0)
+    
+    class Meta:
+        unique_together = ['granularity', 'bucket', 'event_name', 'component', 'user_id']
+    
+    def __str__(self):
+        return f"{self.granularity} {self.bucket} - {self.event_name}: {self.event_count}"
+
+
+class ClickstreamSpoolCheckpoint(models.Model):
+    """Byte offset up to which a spool segment has been loaded into ClickstreamEvent"""
+    segment = models.CharField(max_length=100, unique=True)
+    offset = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.segment} @ {self.offset}"
 
 
 class VideoAnalytics(models.Model):
@@ -109,12 +210,27 @@ class VideoAnalytics(models.Model):
     pause_timestamp = models.DateTimeField(null=True, blank=True)
     current_time = models.IntegerField(default=0, help_text="Current playback time in seconds")
     total_watched = models.IntegerField(default=0, help_text="Total time watched in seconds")
+    watched_intervals = models.BinaryField(default=b'', blank=True, help_text="Packed [start, end) second ranges watched (see video_positions.WatchedIntervals)")
     completed = models.BooleanField(default=False)
     
+    class Meta:
+        unique_together = ['user', 'content']
+    
     def __str__(self):
         return f"{self.user.username} - {self.content.title} - {self.current_time}s"
 
 
+class VideoEngagement(models.Model):
+    """Per-second engagement curve for one video, summed over all viewers"""
+    content = models.OneToOneField(Content, on_delete=models.CASCADE, related_name='engagement')
+    views = models.BinaryField(default=b'', help_text="Packed uint32 per second: times watched, including rewatches")
+    viewers = models.BinaryField(default=b'', help_text="Packed uint32 per second: distinct users who watched it")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Engagement - {self.content.title}"
+
+
 # New Quiz System Models
 
 class TeacherProfile(models.Model):
@@ -272,12 +388,57 @@ class QuizAnalytics(models.Model):
     difficult_questions = models.JSONField(default=list, help_text="Questions with low success rate")
     common_mistakes = models.JSONField(default=dict, help_text="Word cloud data for common wrong answers")
     topic_performance = models.JSONField(default=dict, help_text="Performance by topic")
+    score_sum = models.BigIntegerField(default=0, help_text="Running sum of submitted scores")
     generated_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"Analytics for {self.quiz.title}"
 
 
+class QuizQuestionStats(models.Model):
+    """Running answer counters for one live quiz question, incremented by every submission"""
+    question = models.OneToOneField(QuizQuestion, on_delete=models.CASCADE, related_name='stats')
+    answered = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    wrong_a = models.PositiveIntegerField(default=0)
+    wrong_b = models.PositiveIntegerField(default=0)
+    wrong_c = models.PositiveIntegerField(default=0)
+    wrong_d = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"Stats for {self.question}"
+
+
+class BackgroundJob(models.Model):
+    """Queued work run by `manage.py run_jobs`; one row per (kind, key), so re-enqueueing is deduplicated"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=50)
+    key = models.CharField(max_length=100, help_text="Deduplication key within the kind, e.g. a participant id")
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not picked up before this time (retry backoff)")
+    locked_at = models.DateTimeField(null=True, blank=True, help_text="When a worker claimed the job")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['kind', 'key']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}:{self.key} ({self.status})"
+
+
 # ============ POLL SYSTEM MODELS ============
 
 class Poll(models.Model):
@@ -0,0 +1,172 @@
+"""
+Cached per-user, per-course progress summaries for the dashboard and course pages
+
+Two cache entries are read together with one get_many():
+    progress:catalog        course_id -> number of content items
+    progress:user:<id>      course_id -> {'items': {content_id: (completed, completed_at)}}
+Writers call invalidate_user_progress() / invalidate_progress_catalog(), which
+drop the entry after the surrounding transaction commits.
+
+Progress rows are written with upsert_user_progress() / upsert_video_analytics():
+one INSERT ... ON CONFLICT (user, content) DO UPDATE per batch, so concurrent
+tabs cannot race a get_or_create() into duplicates or lost updates.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .leaderboards import record_progress_change
+from .models import Course, UserProgress, VideoAnalytics
+
+CATALOG_KEY = 'progress:catalog'
+
+
+def _user_key(user_id):
+    return f'progress:user:{user_id}'
+
+
+def _cache_timeout():
+    return getattr(settings, 'PROGRESS_SUMMARY_CACHE_SECONDS', 3600)
+
+
+def _load_catalog():
+    return dict(Course.objects.annotate(total=Count('contents')).values_list('id', 'total'))
+
+
+def _load_user_items(user_id):
+    courses = {}
+    rows = UserProgress.objects.filter(user_id=user_id).values_list(
+        'content_id', 'content__course_id', 'completed', 'completed_at'
+    )
+    for content_id, course_id, completed, completed_at in rows:
+        courses.setdefault(course_id, {})[content_id] = (completed, completed_at)
+    return courses
+
+
+def _summarize(items, total):
+    completed = sum(1 for done, _ in items.values() if done)
+    times = [completed_at for _, completed_at in items.values() if completed_at]
+    return {
+        'completed': completed,
+        'started': len(items),
+        'total': total,
+        'percentage': round(completed / total * 100, 2) if total else 0,
+        'last_activity': max(times) if times else None,
+    }
+
+
+def _cached_progress(user_id):
+    """Catalog totals and the user's progress items, from one cache round trip"""
+    user_key = _user_key(user_id)
+    cached = cache.get_many([CATALOG_KEY, user_key])
+
+    missing = {}
+    catalog = cached.get(CATALOG_KEY)
+    if catalog is None:
+        catalog = missing[CATALOG_KEY] = _load_catalog()
+    items = cached.get(user_key)
+    if items is None:
+        items = missing[user_key] = _load_user_items(user_id)
+    if missing:
+        cache.set_many(missing, _cache_timeout())
+    return catalog, items
+
+
+def user_progress_summary(user_id):
+    """
+    Overall and per-course progress for a user
+
+    Returns:
+        dict: completed, total, percentage, last_activity, and 'courses'
+            mapping course_id to the same fields plus 'started'
+    """
+    catalog, items = _cached_progress(user_id)
+    courses = {course_id: _summarize(items.get(course_id, {}), total) for course_id, total in catalog.items()}
+
+    summary = _summarize({}, sum(catalog.values()))
+    summary['completed'] = sum(course['completed'] for course in courses.values())
+    summary['percentage'] = round(summary['completed'] / summary['total'] * 100, 2) if summary['total'] else 0
+    activity = [course['last_activity'] for course in courses.values() if course['last_activity']]
+    summary['last_activity'] = max(activity) if activity else None
+    summary['courses'] = courses
+    return summary
+
+
+def course_progress_summary(user_id, course_id):
+    """
+    Progress for one course, plus per-content status
+
+    Returns:
+        dict: completed, started, total, percentage, last_activity, and 'items'
+            mapping content_id to {'completed', 'completed_at'}
+    """
+    catalog, items = _cached_progress(user_id)
+    course_items = items.get(course_id, {})
+    summary = _summarize(course_items, catalog.get(course_id, 0))
+    summary['items'] = {
+        content_id: {'completed': completed, 'completed_at': completed_at}
+        for content_id, (completed, completed_at) in course_items.items()
+    }
+    return summary
+
+
+def invalidate_user_progress(user_id):
+    """Drop a user's cached progress once the current transaction commits"""
+    key = _user_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_progress_catalog():
+    """Drop the cached content totals (call when content items are added or removed)"""
+    transaction.on_commit(lambda: cache.delete(CATALOG_KEY))
+
+
+def _upsert_by_user_content(model, user_id, updates):
+    """
+    Insert or update rows keyed on (user, content) with bulk_create(update_conflicts=True)
+
+    Rows that set the same fields share one statement; on conflict only those
+    fields are overwritten, everything else on the existing row is kept.
+    """
+    groups = defaultdict(list)
+    for content_id, fields in updates.items():
+        groups[tuple(sorted(fields))].append(model(user_id=user_id, content_id=content_id, **fields))
+
+    for update_fields, rows in groups.items():
+        if update_fields:
+            model.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['user', 'content'], update_fields=list(update_fields),
+            )
+        else:
+            model.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def upsert_user_progress(user_id, updates):
+    """
+    Write UserProgress rows for one user and invalidate their cached summary;
+    rows that set 'completed' also move the user on the progress leaderboards
+
+    Args:
+        user_id (int): User the rows belong to
+        updates (dict): content_id -> {field: value}; an empty dict only ensures the row exists
+    """
+    _upsert_by_user_content(UserProgress, user_id, updates)
+    invalidate_user_progress(user_id)
+
+    completion_changes = [content_id for content_id, fields in updates.items() if 'completed' in fields]
+    if completion_changes:
+        record_progress_change(user_id, completion_changes)
+
+
+def upsert_video_analytics(user_id, updates):
+    """
+    Write VideoAnalytics rows for one user
+
+    Args:
+        user_id (int): User the rows belong to
+        updates (dict): content_id -> {field: value}, e.g. current_time, pause_timestamp, completed
+    """
+    _upsert_by_user_content(VideoAnalytics, user_id, updates)
@@ -0,0 +1,235 @@
+"""
+Live quiz analytics from running counters
+
+Every submission adds to the quiz's counters inside its own transaction
+(record_submission_stats): participant count and score sum on QuizAnalytics,
+answered / correct / wrong-per-option on QuizQuestionStats, all with F()
+updates so concurrent submits cannot lose increments. Live and final
+analytics are derived from those counters without scanning answers.
+
+generate_quiz_analytics() rebuilds everything (counters included) from a
+participants x questions NumPy matrix of the stored answers; ending a quiz
+falls back to it when the counters do not match the submitted participants,
+e.g. for submissions made before the counters existed.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db.models import Case, Count, F, Q, Value, When
+
+from .models import QuizAnalytics, QuizAnswer, QuizParticipant, QuizQuestionStats
+from .quiz_cache import quiz_questions
+from .quiz_live import live_counts
+
+OPTIONS = 'ABCD'
+OPTION_CODES = {letter: code for code, letter in enumerate(OPTIONS)}
+WRONG_FIELDS = [f'wrong_{letter.lower()}' for letter in OPTIONS]
+UNANSWERED = -1
+OTHER_OPTION = len(OPTIONS)  # a selected value outside A-D
+
+# Questions answered correctly by fewer than this share of respondents are "difficult"
+DIFFICULT_SUCCESS_RATE = 50
+
+
+def _one_if(question_ids):
+    return Case(When(question_id__in=question_ids, then=Value(1)), default=Value(0))
+
+
+def record_submission_stats(quiz_id, score, graded):
+    """
+    Add one submission to the quiz's running counters (call inside the submit transaction)
+
+    Args:
+        score (int): The participant's score
+        graded (list): (question_id, selected_answer, is_correct) per answered question
+    """
+    increment = {'total_participants': F('total_participants') + 1, 'score_sum': F('score_sum') + score}
+    if not QuizAnalytics.objects.filter(quiz_id=quiz_id).update(**increment):
+        QuizAnalytics.objects.bulk_create([QuizAnalytics(quiz_id=quiz_id)], ignore_conflicts=True)
+        QuizAnalytics.objects.filter(quiz_id=quiz_id).update(**increment)
+
+    if not graded:
+        return
+    question_ids = [question_id for question_id, _, _ in graded]
+    correct_ids = [question_id for question_id, _, is_correct in graded if is_correct]
+    wrong_ids = defaultdict(list)
+    for question_id, selected_answer, is_correct in graded:
+        if not is_correct and selected_answer in OPTION_CODES:
+            wrong_ids[WRONG_FIELDS[OPTION_CODES[selected_answer]]].append(question_id)
+
+    updates = {'answered': F('answered') + 1}
+    if correct_ids:
+        updates['correct'] = F('correct') + _one_if(correct_ids)
+    for field, ids in wrong_ids.items():
+        updates[field] = F(field) + _one_if(ids)
+
+    QuizQuestionStats.objects.bulk_create(
+        [QuizQuestionStats(question_id=question_id) for question_id in question_ids], ignore_conflicts=True,
+    )
+    QuizQuestionStats.objects.filter(question_id__in=question_ids).update(**updates)
+
+
+def _question_findings(questions, answered, correct, wrong):
+    """
+    Difficult questions and wrong-answer counts by option text
+
+    Args:
+        questions (list): Question dicts from the quiz cache, in column order
+        answered, correct (ndarray): Per-question counts
+        wrong (ndarray): questions x options counts of wrong answers
+    """
+    success_rates = np.divide(correct, answered, out=np.ones(len(questions)), where=answered > 0) * 100
+
+    # Find difficult questions (less than 50% correct)
+    difficult_questions = [
+        {
+            'question_id': questions[index]['id'],
+            'question_text': questions[index]['question_text'],
+            'success_rate': float(success_rates[index]),
+        }
+        for index in np.flatnonzero((answered > 0) & (success_rates < DIFFICULT_SUCCESS_RATE))
+    ]
+
+    # Summed by option text for the word cloud
+    common_mistakes = {}
+    for index, option in zip(*np.nonzero(wrong)):
+        option_text = questions[index][f'option_{OPTIONS[option].lower()}']
+        if option_text:
+            common_mistakes[option_text] = common_mistakes.get(option_text, 0) + int(wrong[index, option])
+    return difficult_questions, common_mistakes
+
+
+def _apply_counters(analytics, quiz):
+    """Fill in the derived QuizAnalytics fields from the running counters"""
+    questions = quiz_questions(quiz.id)
+    stats = {row['question_id']: row for row in QuizQuestionStats.objects.filter(question__quiz=quiz).values()}
+    empty = dict.fromkeys(['answered', 'correct', *WRONG_FIELDS], 0)
+    rows = [stats.get(question['id'], empty) for question in questions]
+
+    answered = np.array([row['answered'] for row in rows], dtype=np.int64)
+    correct = np.array([row['correct'] for row in rows], dtype=np.int64)
+    wrong = np.array([[row[field] for field in WRONG_FIELDS] for row in rows], dtype=np.int64).reshape(-1, len(OPTIONS))
+
+    total = analytics.total_participants
+    joined = max(live_counts(quiz.id)['joined'], total)
+    analytics.average_score = analytics.score_sum / total if total else 0
+    analytics.completion_rate = total / joined * 100 if joined else 0
+    analytics.difficult_questions, analytics.common_mistakes = _question_findings(questions, answered, correct, wrong)
+    return analytics
+
+
+def live_quiz_analytics(quiz):
+    """
+    Current analytics for a quiz, derived from the running counters (not saved)
+
+    Returns:
+        QuizAnalytics: Or None if nobody has submitted yet
+    """
+    analytics = QuizAnalytics.objects.filter(quiz=quiz).first()
+    if analytics is None or not analytics.total_participants:
+        return None
+    return _apply_counters(analytics, quiz)
+
+
+def finalize_quiz_analytics(quiz):
+    """Store the final analytics when a quiz ends, rebuilding from answers if the counters are incomplete"""
+    submitted = quiz.participants.filter(submitted_at__isnull=False).count()
+    analytics = QuizAnalytics.objects.filter(quiz=quiz).first()
+    if analytics is None or analytics.total_participants != submitted:
+        generate_quiz_analytics(quiz)
+        return
+    _apply_counters(analytics, quiz).save()
+
+
+def answer_matrix(quiz_id, question_ids):
+    """
+    Selected options and correctness of every answer to a quiz
+
+    Args:
+        question_ids (list): Question ids in column order
+
+    Returns:
+        tuple: (selected, correct) arrays of shape participants x questions;
+            selected holds option indexes (UNANSWERED where no answer)
+    """
+    rows = list(
+        QuizAnswer.objects.filter(participant__quiz_id=quiz_id, question_id__in=question_ids)
+        .values_list('participant_id', 'question_id', 'selected_answer', 'is_correct')
+    )
+    if not rows:
+        empty = np.zeros((0, len(question_ids)))
+        return empty.astype(np.int8), empty.astype(bool)
+
+    participant_ids, answer_question_ids, selected_answers, is_correct = zip(*rows)
+    participants, row_index = np.unique(np.asarray(participant_ids, dtype=np.int64), return_inverse=True)
+
+    columns = np.asarray(question_ids, dtype=np.int64)
+    order = np.argsort(columns)
+    column_index = order[np.searchsorted(columns, np.asarray(answer_question_ids, dtype=np.int64), sorter=order)]
+
+    codes = np.array([OPTION_CODES.get(answer, OTHER_OPTION) for answer in selected_answers], dtype=np.int8)
+
+    selected = np.full((len(participants), len(columns)), UNANSWERED, dtype=np.int8)
+    correct = np.zeros((len(participants), len(columns)), dtype=bool)
+    selected[row_index, column_index] = codes
+    correct[row_index, column_index] = is_correct
+    return selected, correct
+
+
+def generate_quiz_analytics(quiz):
+    """Rebuild a quiz's analytics and running counters from all stored answers"""
+    print(f"🎯 Generating analytics for quiz: {quiz.title}")
+
+    counts = QuizParticipant.objects.filter(quiz=quiz).aggregate(
+        joined=Count('id'),
+        submitted=Count('id', filter=Q(submitted_at__isnull=False)),
+    )
+    total_participants = counts['submitted']
+    if total_participants == 0:
+        return
+
+    scores = np.fromiter(
+        quiz.participants.filter(submitted_at__isnull=False).values_list('score', flat=True),
+        dtype=np.int64, count=total_participants,
+    )
+    average_score = float(scores.mean())
+    completion_rate = total_participants / counts['joined'] * 100
+
+    questions = quiz_questions(quiz.id)
+    selected, correct = answer_matrix(quiz.id, [question['id'] for question in questions])
+
+    answered = selected != UNANSWERED
+    answered_counts = answered.sum(axis=0)
+    correct_counts = correct.sum(axis=0)
+    wrong = answered & ~correct
+    wrong_counts = np.stack([(wrong & (selected == option)).sum(axis=0) for option in range(len(OPTIONS))], axis=1)
+    difficult_questions, common_mistakes = _question_findings(questions, answered_counts, correct_counts, wrong_counts)
+
+    QuizQuestionStats.objects.bulk_create(
+        [
+            QuizQuestionStats(
+                question_id=question['id'],
+                answered=int(answered_counts[index]),
+                correct=int(correct_counts[index]),
+                **{field: int(wrong_counts[index, option]) for option, field in enumerate(WRONG_FIELDS)},
+            )
+            for index, question in enumerate(questions)
+        ],
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=['answered', 'correct', *WRONG_FIELDS],
+    )
+
+    # Save analytics
+    QuizAnalytics.objects.update_or_create(
+        quiz=quiz,
+        defaults={
+            'total_participants': total_participants,
+            'score_sum': int(scores.sum()),
+            'average_score': average_score,
+            'completion_rate': completion_rate,
+            'difficult_questions': difficult_questions,
+            'common_mistakes': common_mistakes,
+            'topic_performance': {}  # Could be enhanced later
+        }
+    )
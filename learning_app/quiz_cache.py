@@ -0,0 +1,95 @@
+"""
+Versioned per-quiz cache of the ordered question payload and answer key
+
+Student views (join, take, submit) and the results page read questions from
+here instead of querying QuizQuestion on every request. Anything that adds,
+approves, rejects, deletes or reorders questions calls bump_quiz_questions(),
+which once the transaction commits sets the quiz's version to the current
+time and drops the payload; a cached payload stamped with another version is
+reloaded on next read. Time-based versions never repeat, so a version key
+the cache evicted cannot come back equal to a stale payload's stamp. Bumps
+reach other processes only through a shared cache (REDIS_URL); with the
+per-process default, QUIZ_QUESTION_CACHE_SECONDS bounds how stale they get.
+
+Cache entries:
+    quiz:<id>:questions:version    time of the last change in ns (no expiry)
+    quiz:<id>:questions            {'version', 'questions', 'answer_key'}
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import QuizQuestion
+
+QUESTION_FIELDS = [
+    'id', 'order', 'question_text', 'question_type',
+    'option_a', 'option_b', 'option_c', 'option_d',
+    'explanation', 'approval_status',
+]
+
+
+def _version_key(quiz_id):
+    return f'quiz:{quiz_id}:questions:version'
+
+
+def _payload_key(quiz_id):
+    return f'quiz:{quiz_id}:questions'
+
+
+def _cache_timeout():
+    return getattr(settings, 'QUIZ_QUESTION_CACHE_SECONDS', 3600)
+
+
+def _load_payload(quiz_id, version):
+    questions = []
+    answer_key = {}
+    rows = QuizQuestion.objects.filter(quiz_id=quiz_id).order_by('order', 'id').values(*QUESTION_FIELDS, 'correct_answer')
+    for row in rows:
+        answer_key[row['id']] = row.pop('correct_answer')
+        questions.append(row)
+    return {'version': version, 'questions': questions, 'answer_key': answer_key}
+
+
+def _quiz_payload(quiz_id):
+    version_key = _version_key(quiz_id)
+    payload_key = _payload_key(quiz_id)
+    cached = cache.get_many([version_key, payload_key])
+
+    version = cached.get(version_key, 0)
+    payload = cached.get(payload_key)
+    if payload is None or payload['version'] != version:
+        payload = _load_payload(quiz_id, version)
+        cache.set(payload_key, payload, _cache_timeout())
+    return payload
+
+
+def quiz_questions(quiz_id):
+    """
+    Ordered questions of a quiz, without correct answers
+
+    Returns:
+        list: Dicts with the QUESTION_FIELDS of each question
+    """
+    return _quiz_payload(quiz_id)['questions']
+
+
+def quiz_answer_key(quiz_id):
+    """
+    Returns:
+        dict: question_id -> correct answer letter
+    """
+    return _quiz_payload(quiz_id)['answer_key']
+
+
+def bump_quiz_questions(quiz_id):
+    """Invalidate the quiz's cached questions once the current transaction commits"""
+    version_key = _version_key(quiz_id)
+    payload_key = _payload_key(quiz_id)
+
+    def bump():
+        cache.set(version_key, time.time_ns(), None)
+        cache.delete(payload_key)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,117 @@
+"""
+Burst-tolerant joining of live quizzes
+
+When a code goes up on the projector, hundreds of joins arrive within
+seconds. The active code -> quiz map is cached (start_quiz / end_quiz drop
+it; QUIZ_CODE_CACHE_SECONDS bounds staleness in other processes), the
+question count comes from the quiz question cache, and the participant row
+is written with a single INSERT ... ON CONFLICT DO NOTHING RETURNING. SQLite
+"database is locked" errors are retried with jittered exponential backoff.
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from .models import LiveQuiz, QuizParticipant
+from .quiz_cache import quiz_questions
+
+ACTIVE_CODES_KEY = 'quiz:active_codes'
+
+LOCK_RETRY_ATTEMPTS = 6
+LOCK_RETRY_BASE_DELAY = 0.05
+
+
+def _cache_timeout():
+    return getattr(settings, 'QUIZ_CODE_CACHE_SECONDS', 30)
+
+
+def _load_active_codes():
+    return dict(LiveQuiz.objects.filter(status='active').values_list('quiz_code', 'id'))
+
+
+def invalidate_active_codes():
+    """Drop the cached code map once the current transaction commits (call when a quiz starts or ends)"""
+    transaction.on_commit(lambda: cache.delete(ACTIVE_CODES_KEY))
+
+
+def active_quiz_id(quiz_code):
+    """
+    Id of the active quiz with this code, or None
+
+    Codes missing from the cached map are checked against the database once,
+    so a quiz started in another process is joinable before the map expires.
+    """
+    codes = cache.get(ACTIVE_CODES_KEY)
+    if codes is None:
+        codes = _load_active_codes()
+        cache.set(ACTIVE_CODES_KEY, codes, _cache_timeout())
+
+    quiz_id = codes.get(quiz_code)
+    if quiz_id is None:
+        quiz_id = LiveQuiz.objects.filter(quiz_code=quiz_code, status='active').values_list('id', flat=True).first()
+        if quiz_id is not None:
+            cache.delete(ACTIVE_CODES_KEY)
+    return quiz_id
+
+
+def retry_on_locked(func, attempts=LOCK_RETRY_ATTEMPTS, base_delay=LOCK_RETRY_BASE_DELAY):
+    """
+    Call func(), retrying SQLite "database is locked" errors with jittered exponential backoff
+
+    Must not run inside an outer transaction: the lock error aborts it.
+    """
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError as e:
+            if 'locked' not in str(e).lower() or attempt == attempts - 1:
+                raise
+            time.sleep(base_delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def upsert_participant(quiz_id, student_name, student_email, total_questions):
+    """
+    Insert the participant unless (quiz, email) already joined
+
+    Returns:
+        tuple: (participant_id, created)
+    """
+    qn = connection.ops.quote_name
+    table = qn(QuizParticipant._meta.db_table)
+    columns = ', '.join(qn(c) for c in ('quiz_id', 'student_name', 'student_email', 'joined_at', 'score', 'total_questions'))
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES (%s, %s, %s, %s, 0, %s) "
+        f"ON CONFLICT ({qn('quiz_id')}, {qn('student_email')}) DO NOTHING RETURNING {qn('id')}"
+    )
+    joined_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [quiz_id, student_name, student_email, joined_at, total_questions])
+        row = cursor.fetchone()
+    if row is not None:
+        return row[0], True
+
+    participant_id = QuizParticipant.objects.filter(quiz_id=quiz_id, student_email=student_email).values_list('id', flat=True).first()
+    return participant_id, False
+
+
+def _join(quiz_code, student_name, student_email):
+    quiz_id = active_quiz_id(quiz_code)
+    if quiz_id is None:
+        return None
+    total_questions = len(quiz_questions(quiz_id))
+    participant_id, created = upsert_participant(quiz_id, student_name, student_email, total_questions)
+    return quiz_id, participant_id, created
+
+
+def join_quiz_code(quiz_code, student_name, student_email):
+    """
+    Join the active quiz with this code (safe to retry: the insert is idempotent)
+
+    Returns:
+        tuple: (quiz_id, participant_id, created), or None if no active quiz has the code
+    """
+    return retry_on_locked(lambda: _join(quiz_code, student_name, student_email))
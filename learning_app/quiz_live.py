@@ -0,0 +1,170 @@
+"""
+Live quiz monitor feed - per-quiz counters and participant deltas
+
+join_quiz and submit_quiz bump per-quiz cache counters (joined, submitted)
+and a change sequence. Monitors poll the sequence, which costs one cache
+read; only when it moved do they query the participants that joined or
+submitted since their cursor. The monitor page polls the JSON endpoint every
+QUIZ_MONITOR_POLL_SECONDS. Server-Sent Events hold a worker thread for the
+whole stream, so they are only used when QUIZ_MONITOR_SSE is on, which needs
+async workers and a cache shared by all processes.
+
+Cache entries (no expiry; recounted from the database if evicted):
+    quiz:<id>:live:seq          incremented on every join or submission
+    quiz:<id>:live:joined
+    quiz:<id>:live:submitted
+"""
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import QuizParticipant
+from .utils import parse_datetime_param
+
+# Rows are committed slightly after their joined_at / submitted_at is set, so
+# each delta re-reads this far behind the previous cursor (clients upsert by id)
+CURSOR_OVERLAP = timedelta(seconds=5)
+
+PARTICIPANT_FIELDS = ['id', 'student_name', 'student_email', 'joined_at', 'submitted_at', 'score', 'total_questions']
+
+
+def _keys(quiz_id):
+    return {
+        'seq': f'quiz:{quiz_id}:live:seq',
+        'joined': f'quiz:{quiz_id}:live:joined',
+        'submitted': f'quiz:{quiz_id}:live:submitted',
+    }
+
+
+def _bump(quiz_id, counter):
+    keys = _keys(quiz_id)
+    try:
+        cache.incr(keys[counter])
+        cache.incr(keys['seq'])
+    except ValueError:
+        # Evicted or never counted - drop all three so the next read recounts
+        cache.delete_many(list(keys.values()))
+
+
+def record_join(quiz_id):
+    transaction.on_commit(lambda: _bump(quiz_id, 'joined'))
+
+
+def record_submission(quiz_id):
+    transaction.on_commit(lambda: _bump(quiz_id, 'submitted'))
+
+
+def live_counts(quiz_id, recount=False):
+    """
+    Args:
+        recount (bool): Recount joined/submitted from the database and reset the counters
+
+    Returns:
+        dict: seq, joined and submitted for the quiz (one cache read when warm)
+    """
+    keys = _keys(quiz_id)
+    cached = {} if recount else cache.get_many(list(keys.values()))
+    if len(cached) == len(keys):
+        return {name: cached[key] for name, key in keys.items()}
+
+    counts = QuizParticipant.objects.filter(quiz_id=quiz_id).aggregate(
+        joined=Count('id'), submitted=Count('id', filter=Q(submitted_at__isnull=False)),
+    )
+    cache.add(keys['seq'], 0, None)
+    cache.set_many({keys['joined']: counts['joined'], keys['submitted']: counts['submitted']}, None)
+    counts['seq'] = cache.get(keys['seq'], 0)
+    return counts
+
+
+def _serialize_participant(row):
+    return {
+        **row,
+        'joined_at': row['joined_at'].isoformat() if row['joined_at'] else None,
+        'submitted_at': row['submitted_at'].isoformat() if row['submitted_at'] else None,
+    }
+
+
+def live_delta(quiz_id, since=None, seq=None, force=False):
+    """
+    Changes to a quiz's participants since a cursor
+
+    Args:
+        since (str): Cursor from the previous delta (ISO datetime); empty for everyone
+        seq (int): Change sequence the client last saw
+        force (bool): Query the database (counts included) even if the sequence did not move
+
+    Returns:
+        dict: 'changed': False with the counts if nothing moved, otherwise the
+            counts plus 'participants' (rows joined or submitted since the
+            cursor) and the next 'cursor'
+
+    Raises:
+        ValueError: If `since` is not a valid datetime
+    """
+    counts = live_counts(quiz_id, recount=force)
+    if not force and seq is not None and counts['seq'] == seq:
+        return {'changed': False, **counts}
+
+    since = parse_datetime_param(since)
+    cursor = timezone.now() - CURSOR_OVERLAP
+    rows = QuizParticipant.objects.filter(quiz_id=quiz_id)
+    if since is not None:
+        rows = rows.filter(Q(joined_at__gte=since) | Q(submitted_at__gte=since))
+
+    return {
+        'changed': True,
+        **counts,
+        'participants': [_serialize_participant(row) for row in rows.order_by('joined_at').values(*PARTICIPANT_FIELDS)],
+        'cursor': cursor.isoformat(),
+    }
+
+
+def stream_enabled():
+    return getattr(settings, 'QUIZ_MONITOR_SSE', False)
+
+
+def poll_seconds():
+    return getattr(settings, 'QUIZ_MONITOR_POLL_SECONDS', 3)
+
+
+def resync_seconds():
+    return getattr(settings, 'QUIZ_MONITOR_RESYNC_SECONDS', 10)
+
+
+def _stream_seconds():
+    return getattr(settings, 'QUIZ_MONITOR_STREAM_SECONDS', 300)
+
+
+def live_event_stream(quiz_id, since=None, poll_interval=1.0, keepalive=15):
+    """
+    Server-Sent Events for the monitor page: a 'delta' event whenever the
+    sequence moves, a keepalive comment otherwise. The database is also
+    re-read every QUIZ_MONITOR_RESYNC_SECONDS in case the counters live in a
+    per-process cache that misses other workers' writes. The stream ends
+    after QUIZ_MONITOR_STREAM_SECONDS; EventSource reconnects with the last
+    event id, which is the cursor.
+    """
+    started = last_sync = last_sent = time.monotonic()
+    seq = None
+    yield 'retry: 2000\n\n'
+
+    while time.monotonic() - started < _stream_seconds():
+        now = time.monotonic()
+        delta = live_delta(quiz_id, since, seq, force=now - last_sync >= resync_seconds())
+        if delta['changed']:
+            last_sync = now
+            since = delta['cursor']
+        if delta['changed'] and (delta['participants'] or delta['seq'] != seq):
+            seq = delta['seq']
+            yield f"id: {since}\nevent: delta\ndata: {json.dumps(delta)}\n\n"
+            last_sent = now
+        elif now - last_sent >= keepalive:
+            yield ': keepalive\n\n'
+            last_sent = now
+        time.sleep(poll_interval)
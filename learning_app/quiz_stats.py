@@ -0,0 +1,72 @@
+"""
+Per-question response distributions for the quiz results page
+
+All option counts of a quiz come from one grouped aggregation over
+QuizAnswer, keyed by (question_id, selected_answer), plus one grouped count
+of SubjectiveAnswer, which is the only source for subjective questions'
+totals. The result is cached per quiz and dropped when a submission commits.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import QuizAnswer, SubjectiveAnswer
+
+OPTIONS = ['A', 'B', 'C', 'D']
+
+
+def _stats_key(quiz_id):
+    return f'quiz:{quiz_id}:stats'
+
+
+def _cache_timeout():
+    return getattr(settings, 'QUIZ_STATS_CACHE_SECONDS', 3600)
+
+
+def _load_distributions(quiz_id):
+    distributions = {}
+    rows = (
+        QuizAnswer.objects.filter(question__quiz_id=quiz_id)
+        .exclude(question__question_type='subjective')
+        .values_list('question_id', 'selected_answer')
+        .annotate(responses=Count('id'))
+        .order_by()
+    )
+    for question_id, selected_answer, responses in rows:
+        counts = distributions.setdefault(question_id, {'total': 0, **dict.fromkeys(OPTIONS, 0)})
+        counts['total'] += responses
+        if selected_answer in OPTIONS:
+            counts[selected_answer] += responses
+
+    subjective = (
+        SubjectiveAnswer.objects.filter(question__quiz_id=quiz_id, question__question_type='subjective')
+        .values_list('question_id')
+        .annotate(responses=Count('id'))
+        .order_by()
+    )
+    for question_id, responses in subjective:
+        distributions[question_id] = {'total': responses}
+    return distributions
+
+
+def question_distributions(quiz_id):
+    """
+    Response counts for every question of a quiz
+
+    Returns:
+        dict: question_id -> {'total', 'A', 'B', 'C', 'D'} (only 'total' for
+            subjective questions); questions without answers are absent
+    """
+    key = _stats_key(quiz_id)
+    distributions = cache.get(key)
+    if distributions is None:
+        distributions = _load_distributions(quiz_id)
+        cache.set(key, distributions, _cache_timeout())
+    return distributions
+
+
+def invalidate_quiz_stats(quiz_id):
+    """Drop the quiz's cached distributions once the current transaction commits"""
+    key = _stats_key(quiz_id)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,151 @@
+"""
+Per-minute and per-hour clickstream rollups, maintained as events are written
+"""
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour, TruncMinute
+
+from .models import ClickstreamEvent, ClickstreamRollup
+
+GRANULARITIES = {
+    'minute': (TruncMinute, timedelta(minutes=1)),
+    'hour': (TruncHour, timedelta(hours=1)),
+}
+
+
+def bucket_start(timestamp, granularity):
+    """Truncate an aware timestamp to the start of its UTC minute or hour"""
+    timestamp = timestamp.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        timestamp = timestamp.replace(minute=0)
+    return timestamp
+
+
+def _upsert_counts(counts):
+    """
+    Add counts to rollup rows with one INSERT ... ON CONFLICT DO UPDATE per batch
+
+    Args:
+        counts (Counter): (granularity, bucket, event_name, component, user_id) -> count
+    """
+    if not counts:
+        return
+
+    qn = connection.ops.quote_name
+    table = qn(ClickstreamRollup._meta.db_table)
+    key_columns = ', '.join(qn(c) for c in ('granularity', 'bucket', 'event_name', 'component', 'user_id'))
+    sql = (
+        f"INSERT INTO {table} ({key_columns}, {qn('event_count')}) VALUES (%s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({key_columns}) DO UPDATE SET "
+        f"{qn('event_count')} = {table}.{qn('event_count')} + excluded.{qn('event_count')}"
+    )
+    rows = [
+        (granularity, connection.ops.adapt_datetimefield_value(bucket), event_name, component, user_id, count)
+        for (granularity, bucket, event_name, component, user_id), count in counts.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def update_rollups(events):
+    """
+    Fold a batch of event dicts into the minute and hour rollups
+
+    Args:
+        events (list): Event dicts keyed by ClickstreamEvent field names
+    """
+    counts = Counter()
+    for event in events:
+        for granularity in GRANULARITIES:
+            counts[(
+                granularity,
+                bucket_start(event['timestamp'], granularity),
+                event['event_name'],
+                event['component'],
+                event.get('user_id') or 0,
+            )] += 1
+    _upsert_counts(counts)
+
+
+def rebuild_rollups(start=None, end=None, chunk=timedelta(days=1)):
+    """
+    Recompute rollups from the raw event table, one time chunk at a time
+
+    Args:
+        start, end: Optional aware datetimes bounding the rebuild; both are
+            widened to whole hours so no bucket is left half-counted
+
+    Returns:
+        int: Number of events folded into the rollups
+    """
+    events = ClickstreamEvent.objects.order_by()
+    if start is None:
+        start = events.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if end is None:
+        end = events.order_by('-timestamp').values_list('timestamp', flat=True).first()
+    if start is None or end is None:
+        return 0
+
+    start = bucket_start(start, 'hour')
+    end = bucket_start(end, 'hour') + timedelta(hours=1)
+    total = 0
+
+    window_start = start
+    while window_start < end:
+        window_end = min(window_start + chunk, end)
+        window = events.filter(timestamp__gte=window_start, timestamp__lt=window_end)
+
+        with transaction.atomic():
+            ClickstreamRollup.objects.filter(bucket__gte=window_start, bucket__lt=window_end).delete()
+
+            counts = Counter()
+            for granularity, (trunc, _) in GRANULARITIES.items():
+                grouped = (
+                    window.annotate(bucket=trunc('timestamp'))
+                    .values('bucket', 'event_name', 'component__value', 'user_id')
+                    .annotate(count=Count('id'))
+                )
+                for row in grouped:
+                    counts[(
+                        granularity, row['bucket'], row['event_name'], row['component__value'] or '', row['user_id'] or 0,
+                    )] += row['count']
+            _upsert_counts(counts)
+
+        total += sum(c for key, c in counts.items() if key[0] == 'hour')
+        window_start = window_end
+
+    return total
+
+
+def total_events():
+    """Total number of events recorded, read from the hourly rollups"""
+    totals = ClickstreamRollup.objects.filter(granularity='hour').aggregate(total=Sum('event_count'))
+    return totals['total'] or 0
+
+
+def event_timeseries(granularity='hour', start=None, end=None, event_name=None, component=None, user_id=None):
+    """
+    Event counts per bucket, summed over the dimensions that are not filtered on
+
+    Returns:
+        list: [{'bucket': datetime, 'count': int}, ...] in bucket order
+    """
+    rollups = ClickstreamRollup.objects.filter(granularity=granularity)
+    if start is not None:
+        rollups = rollups.filter(bucket__gte=bucket_start(start, granularity))
+    if end is not None:
+        rollups = rollups.filter(bucket__lte=end)
+    if event_name:
+        rollups = rollups.filter(event_name=event_name)
+    if component:
+        rollups = rollups.filter(component=component)
+    if user_id is not None:
+        rollups = rollups.filter(user_id=user_id)
+
+    return [
+        {'bucket': row['bucket'], 'count': row['count']}
+        for row in rollups.values('bucket').annotate(count=Sum('event_count')).order_by('bucket')
+    ]
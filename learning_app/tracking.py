@@ -0,0 +1,196 @@
+"""
+Batched client-side tracking - validates and applies the events the browser
+queue sends to /track-events/ in one request
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Content
+from .progress import upsert_user_progress, upsert_video_analytics
+from .utils import log_clickstream_event
+from .video_positions import track_position
+
+MAX_BATCH_EVENTS = 200
+
+# Player positions (seconds) beyond this are rejected as bogus
+MAX_CURRENT_TIME = 24 * 60 * 60
+
+# Client timestamps older than this (or in the future) are replaced by the server time
+MAX_CLIENT_CLOCK_SKEW = timedelta(hours=1)
+
+VIDEO_EVENTS = {
+    'play': 'video_play',
+    'pause': 'video_pause',
+    'complete': 'video_complete',
+}
+
+# Periodic position updates while playing; coalesced, and not logged to the clickstream
+HEARTBEAT = 'heartbeat'
+VIDEO_TYPES = set(VIDEO_EVENTS) | {HEARTBEAT}
+
+# client event type -> component of the resulting 'click' clickstream event
+CLICK_EVENTS = {
+    'course_click': 'Dashboard',
+    'content_click': 'Course Page',
+    'login_attempt': 'Login Form',
+}
+
+
+def _client_timestamp(value, now):
+    """Epoch milliseconds from the client, trusted only within MAX_CLIENT_CLOCK_SKEW"""
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+        return now
+    try:
+        timestamp = datetime.fromtimestamp(value / 1000, tz=dt_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return now
+    if timestamp > now or now - timestamp > MAX_CLIENT_CLOCK_SKEW:
+        return now
+    return timestamp
+
+
+def validate_client_events(raw_events):
+    """
+    Check and normalise a batch of client events
+
+    Args:
+        raw_events (list): Dicts with type, content_id, current_time, label and ts (epoch ms)
+
+    Returns:
+        tuple: (list of valid event dicts, number of rejected events)
+    """
+    now = timezone.now()
+    events = []
+    rejected = 0
+
+    for raw in raw_events:
+        if not isinstance(raw, dict):
+            rejected += 1
+            continue
+
+        event_type = raw.get('type')
+        content_id = raw.get('content_id')
+        current_time = raw.get('current_time', 0)
+
+        if event_type not in VIDEO_TYPES and event_type not in CLICK_EVENTS:
+            rejected += 1
+            continue
+        if content_id is not None and (not isinstance(content_id, int) or isinstance(content_id, bool)):
+            rejected += 1
+            continue
+        if event_type in VIDEO_TYPES and content_id is None:
+            rejected += 1
+            continue
+        if (not isinstance(current_time, (int, float)) or isinstance(current_time, bool)
+                or not math.isfinite(current_time) or not 0 <= current_time <= MAX_CURRENT_TIME):
+            rejected += 1
+            continue
+
+        events.append({
+            'type': event_type,
+            'content_id': content_id,
+            'current_time': int(current_time),
+            'label': str(raw.get('label') or '')[:200],
+            'timestamp': _client_timestamp(raw.get('ts'), now),
+        })
+
+    return events, rejected
+
+
+def _apply_video_state(user, events, contents):
+    """
+    Fold the video events into VideoAnalytics and UserProgress with bulk
+    INSERT ... ON CONFLICT DO UPDATE statements. Each event goes through the
+    position buffer in order (crediting watched intervals); contents whose
+    events were all coalesced away are not written.
+    """
+    # Latest fields to write per content
+    video_updates = {}
+    for event in events:
+        if event['type'] not in VIDEO_TYPES:
+            continue
+        content_id = event['content_id']
+        fields = track_position(
+            user.id, content_id, event['type'], event['current_time'],
+            contents[content_id].video_duration, now=event['timestamp'].timestamp(),
+        )
+        if fields is None:
+            continue
+        if event['type'] == 'pause':
+            fields['pause_timestamp'] = event['timestamp']
+        elif event['type'] == 'complete':
+            fields['completed'] = True
+        video_updates.setdefault(content_id, {}).update(fields)
+    if not video_updates:
+        return
+
+    upsert_video_analytics(user.id, video_updates)
+
+    now = timezone.now()
+    progress_updates = {
+        content_id: {
+            'completed': True,
+            'completed_at': now,
+            'video_watched_duration': fields['total_watched'],
+        }
+        for content_id, fields in video_updates.items() if fields.get('completed')
+    }
+    if progress_updates:
+        upsert_user_progress(user.id, progress_updates)
+
+
+def apply_client_events(request, events):
+    """
+    Apply validated client events: video state for signed-in users, and one
+    clickstream event each (written in batches by the clickstream sink)
+
+    Returns:
+        int: Number of events applied
+    """
+    user = request.user if request.user.is_authenticated else None
+    content_ids = {event['content_id'] for event in events if event['content_id'] is not None}
+    contents = Content.objects.in_bulk(content_ids) if content_ids else {}
+
+    # Unknown content, or video events from anonymous visitors, are dropped
+    events = [
+        event for event in events
+        if (event['content_id'] is None or event['content_id'] in contents)
+        and (user is not None or event['type'] not in VIDEO_TYPES)
+    ]
+
+    if user is not None:
+        with transaction.atomic():
+            _apply_video_state(user, events, contents)
+
+    for event in events:
+        content = contents.get(event['content_id'])
+        if event['type'] == HEARTBEAT:
+            continue
+        if event['type'] in VIDEO_EVENTS:
+            log_clickstream_event(
+                request=request,
+                event_name=VIDEO_EVENTS[event['type']],
+                component='Video Player',
+                user=user,
+                content=content,
+                payload={'current_time': event['current_time']},
+                timestamp=event['timestamp'],
+            )
+        else:
+            payload = {'action': event['type']}
+            if event['label']:
+                payload['target'] = event['label']
+            log_clickstream_event(
+                request=request,
+                event_name='click',
+                component=CLICK_EVENTS[event['type']],
+                user=user,
+                content=content,
+                payload=payload,
+                timestamp=event['timestamp'],
+            )
+
+    return len(events)
@@ -11,8 +11,15 @@ urlpatterns = [
     path('content/<int:content_id>/', views.content_view, name='content_view'),
     path('submit-quiz/<int:content_id>/', views.submit_quiz_old, name='submit_quiz'),  # Renamed to avoid conflict
     path('track-video/', views.track_video, name='track_video'),
+    path('track-events/', views.track_events, name='track_events'),
     path('mark-read/<int:content_id>/', views.mark_content_read, name='mark_content_read'),
     path('admin-analytics/', views.admin_analytics_view, name='admin_analytics'),
+    path('admin-analytics/timeseries/', views.admin_analytics_timeseries, name='admin_analytics_timeseries'),
+    path('admin-analytics/funnel/', views.admin_funnel_analysis, name='admin_funnel_analysis'),
+    path('admin-analytics/engagement/<int:content_id>/', views.admin_video_engagement, name='admin_video_engagement'),
+    path('admin-analytics/events/', views.admin_events_browser, name='admin_events_browser'),
+    path('admin-analytics/events/api/', views.admin_events_api, name='admin_events_api'),
+    path('admin-analytics/export/<str:dataset>/', views.admin_export, name='admin_export'),
     path('admin-login/', views.admin_login_view, name='admin_login'),
     
     # ============ NEW QUIZ SYSTEM URLS ============
@@ -24,6 +31,8 @@ urlpatterns = [
     path('teacher/quiz/<int:quiz_id>/edit/', views.edit_quiz, name='edit_quiz'),
     path('teacher/quiz/<int:quiz_id>/start/', views.start_quiz, name='start_quiz'),
     path('teacher/quiz/<int:quiz_id>/monitor/', views.quiz_monitor, name='quiz_monitor'),
+    path('teacher/quiz/<int:quiz_id>/monitor/updates/', views.quiz_live_updates, name='quiz_live_updates'),
+    path('teacher/quiz/<int:quiz_id>/monitor/stream/', views.quiz_live_stream, name='quiz_live_stream'),
     path('teacher/quiz/<int:quiz_id>/end/', views.end_quiz, name='end_quiz'),
     path('teacher/quiz/<int:quiz_id>/results/', views.quiz_results, name='quiz_results'),
     path('teacher/quiz/<int:quiz_id>/mistake-analysis/', views.quiz_mistake_analysis, name='quiz_mistake_analysis'),
@@ -44,6 +53,7 @@ urlpatterns = [
     path('quiz/<int:quiz_id>/take/', views.take_quiz, name='take_quiz'),
     path('quiz/<int:quiz_id>/submit/', views.submit_quiz, name='submit_quiz_new'),
     path('quiz/<int:quiz_id>/result/', views.quiz_result, name='quiz_result'),
+    path('quiz/<int:quiz_id>/analysis-status/', views.quiz_analysis_status, name='quiz_analysis_status'),
     path('quiz/<int:quiz_id>/help/', views.student_help_content, name='student_help_content'),
     
     # ============ POLL SYSTEM URLS ============
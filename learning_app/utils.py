@@ -1,6 +1,8 @@
 from django.utils import timezone
-from .models import ClickstreamEvent
+from django.utils.dateparse import parse_date, parse_datetime
+from .clickstream import clickstream_sink
 import re
+from datetime import datetime, time, timezone as dt_timezone
 from collections import Counter
 
 
@@ -24,34 +26,67 @@ def get_referrer(request):
     return request.META.get('HTTP_REFERER', '')
 
 
-def log_clickstream_event(request, event_name, component, description, user=None):
+def parse_datetime_param(value):
     """
-    Log a clickstream event to the database
+    Parse an ISO 8601 date or datetime from a query parameter
+    
+    Returns:
+        datetime: Aware datetime (dates map to midnight UTC), or None if value is empty
+    
+    Raises:
+        ValueError: If the value is not a valid date or datetime
+    """
+    if not value:
+        return None
+    
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date or datetime: {value}')
+        parsed = datetime.combine(day, time.min)
+    
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def log_clickstream_event(request, event_name, component, description='', user=None, duration_ms=None, content=None, payload=None, timestamp=None):
+    """
+    Hand a clickstream event to the configured sink (batched writer or disk spool)
     
     Args:
         request: Django HttpRequest object
         event_name: Type of event (from ClickstreamEvent.EVENT_TYPES)
         component: Component where event occurred
-        description: Detailed description of the event
+        description: Optional free text; normally left empty and rendered from payload on display
         user: User object (optional, will use request.user if not provided)
+        duration_ms: Time taken to serve the request, if measured
+        content: Content object the event refers to (optional)
+        payload: Small dict of structured details, e.g. current_time, answer, score
+        timestamp: When the event happened, if not now (e.g. client-side events sent in a batch)
     """
     # Use provided user or request.user, but allow for anonymous users
     event_user = user if user else (request.user if request.user.is_authenticated else None)
     
-    # Create the clickstream event
-    ClickstreamEvent.objects.create(
-        user=event_user,
-        event_context="Learning Platform - ET617 Assignment",
-        component=component,
-        event_name=event_name,
-        description=description,
-        origin="web",
-        ip_address=get_client_ip(request),
-        user_agent=get_user_agent(request),
-        url=request.build_absolute_uri(),
-        referrer=get_referrer(request),
-        session_id=request.session.session_key or '',
-    )
+    # Capture the event now; the sink writes it to the database later in a batch
+    clickstream_sink.add({
+        'user_id': getattr(event_user, 'pk', None),
+        'timestamp': timestamp or timezone.now(),
+        'event_context': "Learning Platform - ET617 Assignment",
+        'component': component,
+        'event_name': event_name,
+        'content_id': getattr(content, 'pk', None),
+        'payload': payload or {},
+        'description': description,
+        'origin': "web",
+        'ip_address': get_client_ip(request),
+        'user_agent': get_user_agent(request),
+        'url': request.build_absolute_uri(),
+        'referrer': get_referrer(request),
+        'session_id': request.session.session_key or '',
+        'duration_ms': duration_ms,
+    })
 
 
 # ============ WORD CLOUD UTILITIES ============
@@ -0,0 +1,201 @@
+"""
+Coalescing buffer for video playback positions and watched intervals
+
+The latest state per (user, content) is kept in the cache: position, whether
+the player is running, and the set of watched second ranges. Play, pause and
+complete always write through to VideoAnalytics; periodic heartbeats are
+written only when the position moved and the last write is at least
+VIDEO_HEARTBEAT_WRITE_SECONDS old, so heartbeats do not multiply DB writes.
+"""
+import math
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .engagement import apply_engagement
+from .models import VideoAnalytics
+
+BUFFER_TIMEOUT = 60 * 60
+
+# Position advances faster than this (x wall-clock time, plus slack) are seeks, not watching
+MAX_PLAYBACK_RATE = 2.0
+PLAYBACK_SLACK_SECONDS = 2
+
+# Share of the video that must be watched for it to count as completed
+COMPLETION_RATIO = 0.9
+
+# Largest position WatchedIntervals can pack (uint32 seconds)
+MAX_POSITION = 2 ** 32 - 1
+
+
+class WatchedIntervals:
+    """
+    Sorted, non-overlapping [start, end) second ranges, packed as little-endian
+    uint32 start/end pairs for storage in VideoAnalytics.watched_intervals
+    """
+
+    def __init__(self, starts=None, ends=None):
+        self.starts = starts or []
+        self.ends = ends or []
+
+    @classmethod
+    def from_bytes(cls, data):
+        packed = array('I')
+        packed.frombytes(bytes(data or b''))
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return cls(list(packed[0::2]), list(packed[1::2]))
+
+    def to_bytes(self):
+        packed = array('I', [0]) * (2 * len(self.starts))
+        packed[0::2] = array('I', self.starts)
+        packed[1::2] = array('I', self.ends)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return packed.tobytes()
+
+    def add(self, start, end):
+        """
+        Insert [start, end), merging with any ranges it overlaps or touches
+
+        Returns:
+            list: The [start, end) parts that were not covered before
+        """
+        if end <= start:
+            return []
+        # First range ending at/after start, and first range starting after end
+        low = bisect_left(self.ends, start)
+        high = bisect_right(self.starts, end)
+
+        uncovered = []
+        cursor = start
+        for index in range(low, high):
+            if self.starts[index] > cursor:
+                uncovered.append((cursor, self.starts[index]))
+            cursor = max(cursor, self.ends[index])
+        if cursor < end:
+            uncovered.append((cursor, end))
+
+        if low < high:
+            start = min(start, self.starts[low])
+            end = max(end, self.ends[high - 1])
+        self.starts[low:high] = [start]
+        self.ends[low:high] = [end]
+        return uncovered
+
+    def total(self):
+        """Unique seconds watched"""
+        return sum(self.ends) - sum(self.starts)
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def _position_key(user_id, content_id):
+    return f'video_position:{user_id}:{content_id}'
+
+
+def heartbeat_write_interval():
+    return getattr(settings, 'VIDEO_HEARTBEAT_WRITE_SECONDS', 30)
+
+
+def _load_state(user_id, content_id):
+    """Rebuild the buffered state from VideoAnalytics after a cache miss"""
+    row = (
+        VideoAnalytics.objects.filter(user_id=user_id, content_id=content_id)
+        .values('current_time', 'watched_intervals', 'completed')
+        .first()
+    )
+    return {
+        'position': row['current_time'] if row else 0,
+        'playing': False,
+        'seen_at': 0,
+        'written_at': 0,
+        'completed': bool(row and row['completed']),
+        'intervals': bytes(row['watched_intervals']) if row else b'',
+        'pending_views': [],
+        'pending_viewers': [],
+    }
+
+
+def track_position(user_id, content_id, event_type, current_time, duration=0, now=None):
+    """
+    Apply one player event (play, heartbeat, pause, complete) to the buffered state
+
+    The stretch since the previous event is credited as watched when the
+    player was running and the position advanced plausibly (not a seek).
+    Credited stretches are also queued for the video's engagement curve and
+    applied whenever the state is written.
+
+    Args:
+        current_time (float): Player position in seconds; clamped to [0, duration]
+            when the duration is known
+        duration (int): Video length in seconds, for completion detection
+        now (float): Event time as epoch seconds (defaults to the current time)
+
+    Returns:
+        dict: VideoAnalytics fields to write now (current_time, watched_intervals,
+            total_watched, and completed once the watched share reaches
+            COMPLETION_RATIO), or None if the event was coalesced away
+
+    Raises:
+        ValueError: If current_time is not a number or is too large to store
+    """
+    try:
+        position = float(current_time)
+    except (TypeError, ValueError):
+        position = math.nan
+    if not math.isfinite(position) or position > MAX_POSITION:
+        raise ValueError(f"Invalid video position: {current_time!r}")
+    position = max(int(position), 0)
+    if duration:
+        position = min(position, duration)
+
+    key = _position_key(user_id, content_id)
+    now = time.time() if now is None else now
+    state = cache.get(key) or _load_state(user_id, content_id)
+
+    intervals = WatchedIntervals.from_bytes(state['intervals'])
+    previous = state['position']
+
+    if state['playing'] and event_type != 'play':
+        elapsed = max(now - state['seen_at'], 0)
+        if 0 < position - previous <= elapsed * MAX_PLAYBACK_RATE + PLAYBACK_SLACK_SECONDS:
+            state['pending_views'].append((previous, position))
+            state['pending_viewers'].extend(intervals.add(previous, position))
+
+    newly_completed = False
+    if duration and not state['completed'] and intervals.total() >= COMPLETION_RATIO * duration:
+        newly_completed = True
+
+    transition = event_type != 'heartbeat'
+    due = now - state['written_at'] >= heartbeat_write_interval()
+    write = transition or newly_completed or (position != previous and due)
+
+    state.update(
+        position=position,
+        playing=event_type in ('play', 'heartbeat'),
+        seen_at=now,
+        completed=state['completed'] or newly_completed,
+        intervals=intervals.to_bytes(),
+    )
+    if not write:
+        cache.set(key, state, BUFFER_TIMEOUT)
+        return None
+
+    apply_engagement(content_id, duration, state['pending_views'], state['pending_viewers'])
+    state.update(written_at=now, pending_views=[], pending_viewers=[])
+    cache.set(key, state, BUFFER_TIMEOUT)
+
+    fields = {
+        'current_time': position,
+        'watched_intervals': state['intervals'],
+        'total_watched': intervals.total(),
+    }
+    if newly_completed:
+        fields['completed'] = True
+    return fields
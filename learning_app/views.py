@@ -3,19 +3,39 @@ from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
 from django.db.models import Q
 import json
+from datetime import timedelta
 
-from .models import Course, Content, Quiz, UserProgress, ClickstreamEvent, VideoAnalytics, TeacherProfile, LiveQuiz, QuizQuestion, QuizParticipant, QuizAnswer, StudentAnalysis, QuizAnalytics, SubjectiveAnswer, Poll, PollOption, PollResponse, PollAnalytics
-from .utils import get_client_ip, log_clickstream_event, generate_word_cloud_data, create_word_cloud_visualization
+from .models import Course, Content, Quiz, UserProgress, ClickstreamEvent, TeacherProfile, LiveQuiz, QuizQuestion, QuizParticipant, StudentAnalysis, SubjectiveAnswer, Poll, PollOption, PollResponse, PollAnalytics
+from .utils import get_client_ip, log_clickstream_event, parse_datetime_param, generate_word_cloud_data, create_word_cloud_visualization
 from .llm_utils import llm_service
+from .rollups import event_timeseries, total_events as rollup_total_events
+from .clickstream_query import FILTER_PARAMS, parse_event_filters, filter_events, keyset_page
+from .exports import EXPORT_DATASETS, stream_csv, stream_jsonl
+from .tracking import MAX_BATCH_EVENTS, validate_client_events, apply_client_events
+from .funnels import cached_window_analysis
+from .progress import user_progress_summary, course_progress_summary, upsert_user_progress, upsert_video_analytics
+from .video_positions import track_position
+from .engagement import engagement_curve
+from .grading import submit_answers
+from .jobs import STUDENT_ANALYSIS, enqueue_student_analysis, job_status
+from .quiz_cache import quiz_questions, quiz_answer_key, bump_quiz_questions
+from .quiz_live import (
+    live_counts, live_delta, live_event_stream, poll_seconds, record_join, record_submission, resync_seconds,
+    stream_enabled,
+)
+from .quiz_stats import OPTIONS, question_distributions, invalidate_quiz_stats
+from .quiz_analytics import finalize_quiz_analytics, live_quiz_analytics
+from .quiz_join import join_quiz_code, invalidate_active_codes
+from .leaderboards import course_leaderboard, global_leaderboard, quiz_leaderboard, record_quiz_submission
+from django.core.cache import cache
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import base64
-from django.db import transaction
 from collections import Counter
 import qrcode
 try:
@@ -36,8 +56,7 @@ def home(request):
     log_clickstream_event(
         request=request,
         event_name='page_view',
-        component='Homepage',
-        description='User viewed the homepage'
+        component='Homepage'
     )
     
     return render(request, 'learning_app/home.html')
@@ -59,7 +78,6 @@ def register_view(request):
                 request=request,
                 event_name='registration',
                 component='Registration Form',
-                description=f'New user registered with username: {username}',
                 user=user
             )
             
@@ -70,8 +88,7 @@ def register_view(request):
     log_clickstream_event(
         request=request,
         event_name='page_view',
-        component='Registration Page',
-        description='User viewed the registration page'
+        component='Registration Page'
     )
     
     return render(request, 'learning_app/register.html')
@@ -104,7 +121,6 @@ def login_view(request):
                 request=request,
                 event_name='login',
                 component='Login Form',
-                description=f'User {username} logged in successfully (demo mode)',
                 user=user
             )
             
@@ -116,8 +132,7 @@ def login_view(request):
     log_clickstream_event(
         request=request,
         event_name='page_view',
-        component='Login Page',
-        description='User viewed the login page'
+        component='Login Page'
     )
     
     return render(request, 'learning_app/login.html')
@@ -129,7 +144,6 @@ def logout_view(request):
         request=request,
         event_name='logout',
         component='Logout',
-        description=f'User {request.user.username} logged out',
         user=request.user
     )
     
@@ -141,28 +155,37 @@ def logout_view(request):
 @login_required
 def dashboard(request):
     """User dashboard view"""
-    courses = Course.objects.all()
-    user_progress = UserProgress.objects.filter(user=request.user)
-    
-    # Calculate progress statistics
-    total_content = Content.objects.count()
-    completed_content = user_progress.filter(completed=True).count()
-    progress_percentage = (completed_content / total_content * 100) if total_content > 0 else 0
+    courses = list(Course.objects.all())
+    
+    # Progress statistics come from the cached per-user summary
+    summary = user_progress_summary(request.user.id)
+    for course in courses:
+        course.progress = summary['courses'].get(course.id)
+    
+    # Rank and top learners from the in-memory leaderboard (no ORDER BY over all users)
+    leaderboard = global_leaderboard()
+    top_entries = leaderboard.top(5)
+    usernames = dict(User.objects.filter(id__in=[member for member, _, _ in top_entries]).values_list('id', 'username'))
+    top_learners = [
+        {'username': usernames.get(member, ''), 'score': score, 'rank': rank, 'is_me': member == request.user.id}
+        for member, score, rank in top_entries
+    ]
     
     log_clickstream_event(
         request=request,
         event_name='page_view',
         component='Dashboard',
-        description='User viewed the dashboard',
         user=request.user
     )
     
     context = {
         'courses': courses,
-        'user_progress': user_progress,
-        'progress_percentage': round(progress_percentage, 2),
-        'total_content': total_content,
-        'completed_content': completed_content,
+        'progress_percentage': summary['percentage'],
+        'total_content': summary['total'],
+        'completed_content': summary['completed'],
+        'last_activity': summary['last_activity'],
+        'global_rank': leaderboard.rank(request.user.id),
+        'top_learners': top_learners,
     }
     
     return render(request, 'learning_app/dashboard.html', context)
@@ -172,25 +195,26 @@ def dashboard(request):
 def course_detail(request, course_id):
     """Course detail view"""
     course = get_object_or_404(Course, id=course_id)
-    contents = course.contents.all()
+    contents = list(course.contents.all())
     
-    # Get user progress for this course
-    user_progress = UserProgress.objects.filter(user=request.user, content__course=course)
-    progress_dict = {up.content_id: up for up in user_progress}
+    # Per-content status from the cached progress summary
+    course_progress = course_progress_summary(request.user.id, course.id)
+    for content in contents:
+        content.progress = course_progress['items'].get(content.id)
     
     log_clickstream_event(
         request=request,
         event_name='page_view',
         component='Course Detail',
-        description=f'User viewed course: {course.title}',
-        user=request.user
+        user=request.user,
+        payload={'course_id': course.id}
     )
     
     context = {
         'course': course,
         'contents': contents,
-        'progress_dict': progress_dict,
-        'user_progress': user_progress,  # Add this for easier template access
+        'course_progress': course_progress,
+        'course_rank': course_leaderboard(course.id).rank(request.user.id),
     }
     
     return render(request, 'learning_app/course_detail.html', context)
@@ -201,11 +225,11 @@ def content_view(request, content_id):
     """Content view (text, video, or quiz)"""
     content = get_object_or_404(Content, id=content_id)
     
-    # Get or create user progress
-    user_progress, created = UserProgress.objects.get_or_create(
-        user=request.user,
-        content=content
-    )
+    # Read the user's progress; create the row (race-free) on first visit
+    user_progress = UserProgress.objects.filter(user=request.user, content=content).first()
+    if user_progress is None:
+        upsert_user_progress(request.user.id, {content.id: {}})
+        user_progress = UserProgress(user=request.user, content=content)
     
     quiz = None
     if content.content_type == 'quiz':
@@ -215,8 +239,8 @@ def content_view(request, content_id):
         request=request,
         event_name='page_view',
         component=f'{content.content_type.title()} Content',
-        description=f'User {request.user.username} ({request.user.email}) viewed {content.content_type}: {content.title}',
-        user=request.user
+        user=request.user,
+        content=content
     )
     
     context = {
@@ -244,25 +268,20 @@ def submit_quiz_old(request, content_id):
             is_correct = selected_answer == quiz.correct_answer
             score = 1 if is_correct else 0
             
-            # Update user progress
-            user_progress, created = UserProgress.objects.get_or_create(
-                user=request.user,
-                content=content
-            )
-            
-            user_progress.quiz_score = score
-            user_progress.completed = is_correct
+            # Update user progress in one upsert
+            progress_fields = {'quiz_score': score, 'completed': is_correct}
             if is_correct:
-                user_progress.completed_at = timezone.now()
-            user_progress.save()
+                progress_fields['completed_at'] = timezone.now()
+            upsert_user_progress(request.user.id, {content.id: progress_fields})
             
             # Log the quiz attempt
             log_clickstream_event(
                 request=request,
                 event_name='quiz_submit',
                 component='Quiz',
-                description=f'User {request.user.username} ({request.user.email}) submitted quiz for {content.title}. Answer: {selected_answer}, Correct: {is_correct}, Score: {score}',
-                user=request.user
+                user=request.user,
+                content=content,
+                payload={'answer': selected_answer, 'correct': is_correct, 'score': score}
             )
             
             return JsonResponse({
@@ -286,51 +305,51 @@ def track_video(request):
         try:
             data = json.loads(request.body)
             content_id = data.get('content_id')
-            event_type = data.get('event_type')  # play, pause, complete
+            event_type = data.get('event_type')  # play, pause, complete, heartbeat
             current_time = data.get('current_time', 0)
             
             content = get_object_or_404(Content, id=content_id)
             
-            # Get or create video analytics record
-            video_analytics, created = VideoAnalytics.objects.get_or_create(
-                user=request.user,
-                content=content,
-                defaults={'current_time': current_time}
-            )
+            event_names = {'play': 'video_play', 'pause': 'video_pause', 'complete': 'video_complete', 'heartbeat': None}
+            if event_type not in event_names:
+                return JsonResponse({'success': False, 'error': 'Invalid event type'})
+            event_name = event_names[event_type]
+            
+            # Update the buffered position and watched intervals; heartbeats are
+            # only written every VIDEO_HEARTBEAT_WRITE_SECONDS
+            try:
+                video_fields = track_position(request.user.id, content.id, event_type, current_time, content.video_duration)
+            except ValueError as e:
+                return JsonResponse({'success': False, 'error': str(e)}, status=400)
+            if video_fields is None:
+                return JsonResponse({'success': True})
             
-            # Update analytics based on event type
-            if event_type == 'play':
-                event_name = 'video_play'
-                description = f'User {request.user.username} ({request.user.email}) started playing video: {content.title} at {current_time}s'
-            elif event_type == 'pause':
-                event_name = 'video_pause'
-                description = f'User {request.user.username} ({request.user.email}) paused video: {content.title} at {current_time}s'
-                video_analytics.pause_timestamp = timezone.now()
+            if event_type == 'pause':
+                video_fields['pause_timestamp'] = timezone.now()
             elif event_type == 'complete':
-                event_name = 'video_complete'
-                description = f'User {request.user.username} ({request.user.email}) completed video: {content.title}'
-                video_analytics.completed = True
-                
+                video_fields['completed'] = True
+            upsert_video_analytics(request.user.id, {content.id: video_fields})
+            
+            if video_fields.get('completed'):
                 # Mark content as completed
-                user_progress, created = UserProgress.objects.get_or_create(
-                    user=request.user,
-                    content=content
-                )
-                user_progress.completed = True
-                user_progress.completed_at = timezone.now()
-                user_progress.video_watched_duration = content.video_duration
-                user_progress.save()
+                upsert_user_progress(request.user.id, {content.id: {
+                    'completed': True,
+                    'completed_at': timezone.now(),
+                    'video_watched_duration': video_fields['total_watched'],
+                }})
             
-            video_analytics.current_time = current_time
-            video_analytics.save()
+            if event_name is None:
+                # Heartbeats are not logged to the clickstream
+                return JsonResponse({'success': True})
             
             # Log the event
             log_clickstream_event(
                 request=request,
                 event_name=event_name,
                 component='Video Player',
-                description=description,
-                user=request.user
+                user=request.user,
+                content=content,
+                payload={'current_time': current_time}
             )
             
             return JsonResponse({'success': True})
@@ -341,6 +360,34 @@ def track_video(request):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
+@csrf_exempt
+def track_events(request):
+    """
+    Batched tracking endpoint for the client event queue (fetch or sendBeacon)
+    
+    Expects {"events": [{"type", "content_id", "current_time", "label", "ts"}, ...]}
+    and applies the whole batch with bulk writes instead of one request per event.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON data'}, status=400)
+    
+    raw_events = data.get('events') if isinstance(data, dict) else None
+    if not isinstance(raw_events, list):
+        return JsonResponse({'success': False, 'error': 'events must be a list'}, status=400)
+    if len(raw_events) > MAX_BATCH_EVENTS:
+        return JsonResponse({'success': False, 'error': f'At most {MAX_BATCH_EVENTS} events per batch'}, status=400)
+    
+    events, rejected = validate_client_events(raw_events)
+    applied = apply_client_events(request, events)
+    
+    return JsonResponse({'success': True, 'accepted': applied, 'rejected': rejected + len(events) - applied})
+
+
 @login_required
 @csrf_exempt
 def mark_content_read(request, content_id):
@@ -352,23 +399,18 @@ def mark_content_read(request, content_id):
         if content.content_type != 'text':
             return JsonResponse({'success': False, 'error': 'Only text content can be marked as read'})
         
-        # Update user progress
-        user_progress, created = UserProgress.objects.get_or_create(
-            user=request.user,
-            content=content
-        )
-        
-        user_progress.completed = True
-        user_progress.completed_at = timezone.now()
-        user_progress.save()
+        # Update user progress in one upsert
+        upsert_user_progress(request.user.id, {
+            content.id: {'completed': True, 'completed_at': timezone.now()},
+        })
         
         # Log the read event
         log_clickstream_event(
             request=request,
             event_name='text_read',  # Using the new text_read event type
             component='Text Content',
-            description=f'User {request.user.username} ({request.user.email}) marked text content as read: {content.title}',
-            user=request.user
+            user=request.user,
+            content=content
         )
         
         return JsonResponse({
@@ -401,27 +443,212 @@ def admin_analytics_view(request):
         return redirect('admin_login')
     
     # Get all clickstream events for all users
-    recent_events = ClickstreamEvent.objects.all()[:100]
-    
-    # Get user statistics
-    total_users = User.objects.count()
-    total_events = ClickstreamEvent.objects.count()
-    total_content = Content.objects.count()
-    
-    # User progress statistics
-    user_progress_stats = UserProgress.objects.filter(completed=True).count()
+    recent_events = ClickstreamEvent.objects.select_related('user', 'content', *ClickstreamEvent.DIMENSION_FIELDS)[:100]
+    
+    # Event total comes from the rollups; the other counts are cached briefly
+    stats = cache.get('admin_analytics_counts')
+    if stats is None:
+        stats = {
+            'total_users': User.objects.count(),
+            'total_content': Content.objects.count(),
+            'user_progress_stats': UserProgress.objects.filter(completed=True).count(),
+        }
+        cache.set('admin_analytics_counts', stats, 60)
     
     context = {
         'recent_events': recent_events,
-        'total_users': total_users,
-        'total_events': total_events,
-        'total_content': total_content,
-        'user_progress_stats': user_progress_stats,
+        'total_events': rollup_total_events(),
+        **stats,
     }
     
     return render(request, 'learning_app/admin_analytics.html', context)
 
 
+def admin_analytics_timeseries(request):
+    """Clickstream event counts per minute or hour, served from the rollup tables"""
+    if not request.session.get('admin_authenticated'):
+        return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
+    
+    granularity = request.GET.get('granularity', 'hour')
+    if granularity not in ('minute', 'hour'):
+        return JsonResponse({'success': False, 'error': 'granularity must be minute or hour'}, status=400)
+    
+    try:
+        start = parse_datetime_param(request.GET.get('start'))
+        end = parse_datetime_param(request.GET.get('end'))
+        user_id = int(request.GET['user']) if request.GET.get('user') else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    if start is None:
+        # Default window: last 24 hours of hourly data or last 2 hours of minute data
+        span = timedelta(hours=24 if granularity == 'hour' else 2)
+        start = (end or timezone.now()) - span
+    
+    series = event_timeseries(
+        granularity=granularity,
+        start=start,
+        end=end,
+        event_name=request.GET.get('event_name') or None,
+        component=request.GET.get('component') or None,
+        user_id=user_id,
+    )
+    
+    return JsonResponse({
+        'success': True,
+        'granularity': granularity,
+        'series': [{'bucket': point['bucket'].isoformat(), 'count': point['count']} for point in series],
+    })
+
+
+def admin_funnel_analysis(request):
+    """
+    Sessions, course_detail -> content_view -> quiz_submit funnel, and per-content
+    dwell time and drop-off for a window (?start=&end=, default last 30 days; ?gap= minutes)
+    """
+    if not request.session.get('admin_authenticated'):
+        return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
+    
+    try:
+        end = parse_datetime_param(request.GET.get('end'))
+        if end is None:
+            # Round an open-ended window to the minute so repeated requests share a cache entry
+            end = timezone.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+        start = parse_datetime_param(request.GET.get('start')) or end - timedelta(days=30)
+        gap = timedelta(minutes=int(request.GET['gap'])) if request.GET.get('gap') else None
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    if start >= end:
+        return JsonResponse({'success': False, 'error': 'start must be before end'}, status=400)
+    if gap is not None and gap <= timedelta(0):
+        return JsonResponse({'success': False, 'error': 'gap must be positive'}, status=400)
+    
+    return JsonResponse({'success': True, **cached_window_analysis(start, end, gap)})
+
+
+def admin_video_engagement(request, content_id):
+    """Per-second views / distinct viewers for one video (?bucket= seconds per bin)"""
+    if not request.session.get('admin_authenticated'):
+        return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
+    
+    content = get_object_or_404(Content, id=content_id, content_type='video')
+    try:
+        bucket = max(int(request.GET.get('bucket', 1)), 1)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'bucket must be an integer'}, status=400)
+    
+    return JsonResponse({'success': True, **engagement_curve(content, bucket)})
+
+
+def _serialize_event(event):
+    """JSON-friendly representation of a ClickstreamEvent"""
+    return {
+        'id': event.id,
+        'timestamp': event.timestamp.isoformat(),
+        'user_id': event.user_id,
+        'username': event.user.username if event.user else None,
+        'event_name': event.event_name,
+        'component': str(event.component or ''),
+        'content_id': event.content_id,
+        'payload': event.payload,
+        'description': event.get_description(),
+        'url': str(event.url or ''),
+        'referrer': str(event.referrer or ''),
+        'session_id': event.session_id,
+        'ip_address': event.ip_address,
+    }
+
+
+def _event_page(request):
+    """Parse filters and cursor from the query string and fetch one page of events"""
+    filters = parse_event_filters(request.GET)
+    limit = min(max(int(request.GET.get('limit', 50)), 1), 500)
+    events = filter_events(filters).select_related('user', 'content', *ClickstreamEvent.DIMENSION_FIELDS)
+    page, next_cursor = keyset_page(events, cursor=request.GET.get('cursor'), limit=limit)
+    return page, next_cursor
+
+
+def admin_events_browser(request):
+    """Filterable clickstream browser with keyset pagination"""
+    if not request.session.get('admin_authenticated'):
+        return redirect('admin_login')
+    
+    try:
+        events, next_cursor = _event_page(request)
+    except ValueError as e:
+        messages.error(request, f'Invalid filter: {e}')
+        events, next_cursor = [], None
+    
+    # Carry the filters (but not the cursor) into the "older" and export links
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    export_query = query.urlencode()
+    if next_cursor:
+        query['cursor'] = next_cursor
+    
+    context = {
+        'events': events,
+        'filters': {name: request.GET.get(name, '') for name in FILTER_PARAMS},
+        'event_types': ClickstreamEvent.EVENT_TYPES,
+        'next_query': query.urlencode() if next_cursor else '',
+        'export_query': export_query,
+        'is_first_page': not request.GET.get('cursor'),
+    }
+    
+    return render(request, 'learning_app/admin_events.html', context)
+
+
+def admin_events_api(request):
+    """JSON clickstream query API; pass next_cursor back as ?cursor= for the next page"""
+    if not request.session.get('admin_authenticated'):
+        return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
+    
+    try:
+        events, next_cursor = _event_page(request)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'events': [_serialize_event(event) for event in events],
+        'next_cursor': next_cursor,
+    })
+
+
+def admin_export(request, dataset):
+    """
+    Stream a dataset (clickstream, progress or video) as CSV or JSONL
+    
+    Rows are read with QuerySet.iterator() and written as they arrive, so
+    memory stays flat however many rows match. Filters are passed as query
+    parameters (clickstream takes the event browser filters plus include_archive).
+    """
+    if not request.session.get('admin_authenticated'):
+        return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
+    
+    if dataset not in EXPORT_DATASETS:
+        return JsonResponse({'success': False, 'error': f'Unknown dataset: {dataset}'}, status=404)
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        return JsonResponse({'success': False, 'error': 'format must be csv or jsonl'}, status=400)
+    
+    columns, row_source = EXPORT_DATASETS[dataset]
+    try:
+        rows = row_source(request.GET)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    if export_format == 'csv':
+        response = StreamingHttpResponse(stream_csv(columns, rows), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(stream_jsonl(columns, rows), content_type='application/x-ndjson')
+    filename = f"{dataset}-{timezone.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # ============ NEW QUIZ SYSTEM VIEWS ============
 
 def teacher_login_view(request):
@@ -577,6 +804,8 @@ def add_question_manual(request, quiz_id):
                 order=quiz.questions.count() + 1
             )
         
+        bump_quiz_questions(quiz.id)
+        
         return JsonResponse({
             'success': True,
             'question_id': question.id,
@@ -625,6 +854,8 @@ def generate_questions_from_text(request, quiz_id):
             )
             questions_created.append(question.id)
         
+        bump_quiz_questions(quiz.id)
+        
         return JsonResponse({
             'success': True,
             'questions_created': len(questions_created),
@@ -675,6 +906,8 @@ def generate_questions_from_pdf(request, quiz_id):
             )
             questions_created.append(question.id)
         
+        bump_quiz_questions(quiz.id)
+        
         return JsonResponse({
             'success': True,
             'questions_created': len(questions_created),
@@ -698,6 +931,7 @@ def start_quiz(request, quiz_id):
     quiz.status = 'active'
     quiz.started_at = timezone.now()
     quiz.save()
+    invalidate_active_codes()
     
     messages.success(request, f'Quiz "{quiz.title}" is now live! Share code: {quiz.quiz_code}')
     return redirect('quiz_monitor', quiz_id=quiz.id)
@@ -715,12 +949,54 @@ def quiz_monitor(request, quiz_id):
     context = {
         'quiz': quiz,
         'participants': participants,
-        'total_questions': quiz.questions.count()
+        'live_counts': live_counts(quiz.id),
+        'live_stream': stream_enabled(),
+        'poll_seconds': poll_seconds(),
+        'resync_seconds': resync_seconds(),
+        'total_questions': len(quiz_questions(quiz.id))
     }
     
     return render(request, 'learning_app/quiz_monitor.html', context)
 
 
+@teacher_required
+def quiz_live_updates(request, quiz_id):
+    """
+    JSON delta of participants who joined or submitted since ?since= (skipped if
+    ?seq= is current, unless ?force=1 asks for a re-read of the database)
+    """
+    teacher_id = request.session.get('teacher_id')
+    quiz = get_object_or_404(LiveQuiz, id=quiz_id, teacher_id=teacher_id)
+    
+    try:
+        seq = int(request.GET['seq']) if request.GET.get('seq') else None
+        delta = live_delta(quiz.id, request.GET.get('since'), seq, force=request.GET.get('force') == '1')
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    return JsonResponse({'success': True, **delta})
+
+
+@teacher_required
+def quiz_live_stream(request, quiz_id):
+    """Server-Sent Events stream of participant deltas for the live monitor (only if QUIZ_MONITOR_SSE is on)"""
+    if not stream_enabled():
+        raise Http404('Live stream is disabled')
+    teacher_id = request.session.get('teacher_id')
+    quiz = get_object_or_404(LiveQuiz, id=quiz_id, teacher_id=teacher_id)
+    
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since')
+    try:
+        parse_datetime_param(since)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    
+    response = StreamingHttpResponse(live_event_stream(quiz.id, since), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @teacher_required
 def end_quiz(request, quiz_id):
     """End an active quiz"""
@@ -731,9 +1007,10 @@ def end_quiz(request, quiz_id):
     quiz.status = 'ended'
     quiz.ended_at = timezone.now()
     quiz.save()
+    invalidate_active_codes()
     
-    # Generate analytics for the quiz
-    generate_quiz_analytics(quiz)
+    # Final analytics come from the running counters kept by submit_quiz
+    finalize_quiz_analytics(quiz)
     
     messages.success(request, f'Quiz "{quiz.title}" has been ended.')
     return redirect('quiz_results', quiz_id=quiz.id)
@@ -748,33 +1025,27 @@ def quiz_results(request, quiz_id):
     
     participants = quiz.participants.all().order_by('-score')
     
-    # Per-question response stats
+    # Per-question response stats from one grouped aggregation (cached until the next submission)
     question_stats = []
-    for q in quiz.questions.all().order_by('order'):
-        if q.question_type == 'subjective':
-            # Count subjective answers
-            total_subj = q.subjectiveanswer_set.count()
+    answer_key = quiz_answer_key(quiz.id)
+    distributions = question_distributions(quiz.id)
+    for q in quiz_questions(quiz.id):
+        q = dict(q, correct_answer=answer_key[q['id']])
+        counts = distributions.get(q['id'], {})
+        if q['question_type'] == 'subjective':
             question_stats.append({
                 'question': q,
                 'type': 'subjective',
-                'total': total_subj,
+                'total': counts.get('total', 0),
             })
         else:
-            total = QuizAnswer.objects.filter(question=q).count()
-            a = QuizAnswer.objects.filter(question=q, selected_answer='A').count()
-            b = QuizAnswer.objects.filter(question=q, selected_answer='B').count()
-            c = QuizAnswer.objects.filter(question=q, selected_answer='C').count()
-            d = QuizAnswer.objects.filter(question=q, selected_answer='D').count()
             question_stats.append({
                 'question': q,
                 'type': 'mcq',
-                'total': total,
-                'A': a,
-                'B': b,
-                'C': c,
-                'D': d,
+                'total': counts.get('total', 0),
+                **{option: counts.get(option, 0) for option in OPTIONS},
             })
-    analytics = getattr(quiz, 'analytics', None)
+    analytics = live_quiz_analytics(quiz)
     
     # Generate word cloud if analytics exist
     word_cloud_image = None
@@ -803,27 +1074,19 @@ def join_quiz(request):
         student_name = request.POST.get('student_name')
         student_email = request.POST.get('student_email')
         
-        try:
-            quiz = LiveQuiz.objects.get(quiz_code=quiz_code, status='active')
-            
-            # Check if student already joined
-            participant, created = QuizParticipant.objects.get_or_create(
-                quiz=quiz,
-                student_email=student_email,
-                defaults={
-                    'student_name': student_name,
-                    'total_questions': quiz.questions.count()
-                }
-            )
-            
-            if not created:
+        # Cached code lookup and a single-statement upsert, retried if SQLite is locked
+        joined = join_quiz_code(quiz_code, student_name, student_email)
+        if joined is None:
+            messages.error(request, 'Invalid quiz code or quiz is not active.')
+        else:
+            quiz_id, participant_id, created = joined
+            if created:
+                record_join(quiz_id)
+            else:
                 messages.info(request, 'You have already joined this quiz.')
             
-            request.session['participant_id'] = participant.id
-            return redirect('take_quiz', quiz_id=quiz.id)
-            
-        except LiveQuiz.DoesNotExist:
-            messages.error(request, 'Invalid quiz code or quiz is not active.')
+            request.session['participant_id'] = participant_id
+            return redirect('take_quiz', quiz_id=quiz_id)
     
     return render(request, 'learning_app/join_quiz.html')
 
@@ -842,7 +1105,7 @@ def take_quiz(request, quiz_id):
         messages.info(request, 'You have already submitted this quiz.')
         return redirect('quiz_result', quiz_id=quiz.id)
     
-    questions = quiz.questions.all().order_by('order')
+    questions = quiz_questions(quiz.id)
     
     context = {
         'quiz': quiz,
@@ -870,32 +1133,23 @@ def submit_quiz(request, quiz_id):
         data = json.loads(request.body)
         answers = data.get('answers', {})
         
-        score = 0
-        total_questions = quiz.questions.count()
-        
-        # Save answers and calculate score
-        with transaction.atomic():
-            for question_id, selected_answer in answers.items():
-                question = get_object_or_404(QuizQuestion, id=question_id, quiz=quiz)
-                is_correct = selected_answer == question.correct_answer
-                
-                QuizAnswer.objects.create(
-                    participant=participant,
-                    question=question,
-                    selected_answer=selected_answer,
-                    is_correct=is_correct
-                )
-                
-                if is_correct:
-                    score += 1
-            
-            # Update participant
-            participant.score = score
-            participant.submitted_at = timezone.now()
-            participant.save()
+        # Grade against the answer key in memory; answers and score are written in two statements
+        answer_key = quiz_answer_key(quiz.id)
+        total_questions = len(answer_key)
+        try:
+            submitted = submit_answers(participant, answer_key, answers)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        if not submitted:
+            return JsonResponse({'success': False, 'error': 'Already submitted'})
+        record_quiz_submission(participant)
+        record_submission(quiz.id)
+        invalidate_quiz_stats(quiz.id)
+        score = participant.score
         
-        # Generate student analysis
-        generate_student_analysis(participant)
+        # The LLM analysis runs in `manage.py run_jobs` (or on an in-process thread pool when
+        # JOBS_RUN_INLINE is on), never on this request; the result page polls for it
+        enqueue_student_analysis(participant)
         
         return JsonResponse({
             'success': True,
@@ -925,80 +1179,40 @@ def quiz_result(request, quiz_id):
     answers = participant.answers.all().select_related('question')
     analysis = getattr(participant, 'analysis', None)
     
-    # Generate Bloom's taxonomy questions if analysis exists
-    bloom_questions = []
-    if analysis and analysis.weak_topics:
-        for topic in analysis.weak_topics[:2]:  # Limit to 2 topics
-            bloom_questions.extend(
-                llm_service.generate_bloom_taxonomy_questions(topic, analysis.reading_material)
-            )
+    # Practice questions were generated along with the analysis by the background job
+    bloom_questions = analysis.practice_questions if analysis else []
     
     context = {
         'quiz': quiz,
         'participant': participant,
         'answers': answers,
         'analysis': analysis,
-        'bloom_questions': bloom_questions
+        'analysis_status': 'done' if analysis else job_status(STUDENT_ANALYSIS, participant.id),
+        'bloom_questions': bloom_questions,
+        'quiz_rank': quiz_leaderboard(quiz.id).rank(participant.id),
     }
     
     return render(request, 'learning_app/quiz_result.html', context)
 
 
-# ============ UTILITY FUNCTIONS ============
-
-def generate_quiz_analytics(quiz):
-    """Generate analytics for completed quiz"""
-    print(f"🎯 Generating analytics for quiz: {quiz.title}")
-    
-    participants = quiz.participants.filter(submitted_at__isnull=False)
-    total_participants = participants.count()
-    
-    if total_participants == 0:
-        return
-    
-    # Calculate metrics
-    total_score = sum(p.score for p in participants)
-    average_score = total_score / total_participants if total_participants > 0 else 0
-    completion_rate = (total_participants / quiz.participants.count()) * 100
-    
-    # Find difficult questions (less than 50% correct)
-    difficult_questions = []
-    common_mistakes = {}
+def quiz_analysis_status(request, quiz_id):
+    """Poll whether the student's background analysis is ready"""
+    participant_id = request.session.get('participant_id')
+    if not participant_id:
+        return JsonResponse({'success': False, 'error': 'Not authorized'}, status=403)
     
-    for question in quiz.questions.all():
-        correct_answers = QuizAnswer.objects.filter(question=question, is_correct=True).count()
-        total_answers = QuizAnswer.objects.filter(question=question).count()
-        
-        if total_answers > 0:
-            success_rate = (correct_answers / total_answers) * 100
-            if success_rate < 50:
-                difficult_questions.append({
-                    'question_id': question.id,
-                    'question_text': question.question_text,
-                    'success_rate': success_rate
-                })
-        
-        # Collect wrong answers for word cloud
-        wrong_answers = QuizAnswer.objects.filter(question=question, is_correct=False)
-        for answer in wrong_answers:
-            option_text = getattr(question, f'option_{answer.selected_answer.lower()}', '')
-            if option_text:
-                common_mistakes[option_text] = common_mistakes.get(option_text, 0) + 1
+    participant = get_object_or_404(QuizParticipant, id=participant_id, quiz_id=quiz_id)
+    ready = StudentAnalysis.objects.filter(participant=participant).exists()
     
-    # Save analytics
-    QuizAnalytics.objects.update_or_create(
-        quiz=quiz,
-        defaults={
-            'total_participants': total_participants,
-            'average_score': average_score,
-            'completion_rate': completion_rate,
-            'difficult_questions': difficult_questions,
-            'common_mistakes': common_mistakes,
-            'topic_performance': {}  # Could be enhanced later
-        }
-    )
+    return JsonResponse({
+        'success': True,
+        'ready': ready,
+        'status': 'done' if ready else job_status(STUDENT_ANALYSIS, participant.id),
+    })
 
 
+# ============ UTILITY FUNCTIONS ============
+
 def generate_student_analysis(participant):
     """Generate personalized analysis for student"""
     print(f"🎯 Generating analysis for student: {participant.student_name}")
@@ -1075,6 +1289,7 @@ def approve_question(request, quiz_id, question_id):
         question.approval_status = 'approved'
         question.reviewed_at = timezone.now()
         question.save()
+        bump_quiz_questions(quiz.id)
         
         return JsonResponse({
             'success': True,
@@ -1102,6 +1317,7 @@ def reject_question(request, quiz_id, question_id):
         for i, q in enumerate(remaining_questions, 1):
             q.order = i
             q.save()
+        bump_quiz_questions(quiz.id)
         
         return JsonResponse({
             'success': True,
@@ -1129,6 +1345,7 @@ def delete_question(request, quiz_id, question_id):
         for i, q in enumerate(remaining_questions, 1):
             q.order = i
             q.save()
+        bump_quiz_questions(quiz.id)
         
         return JsonResponse({
             'success': True,
@@ -36,8 +36,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    # Temporarily disabled custom middleware to prevent startup issues
-    # 'learning_app.middleware.ClickstreamMiddleware',
+    'learning_app.middleware.ClickstreamMiddleware',
 ]
 
 ROOT_URLCONF = 'learning_platform.urls'
@@ -78,6 +77,19 @@ else:
         }
     }
 
+# Cache shared by every gunicorn worker and `run_jobs` when REDIS_URL is set. Without it each process
+# has its own in-memory cache, so invalidations (question edits, progress, quiz codes) only reach the
+# process that made them and the cache lifetimes below default to a few seconds instead
+REDIS_URL = config('REDIS_URL', default='')
+SHARED_CACHE = bool(REDIS_URL)
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -122,6 +134,87 @@ LOGOUT_REDIRECT_URL = '/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Clickstream capture
+# 'buffer' queues events per worker and writes them with bulk_create;
+# 'spool' appends them to local segment files loaded by `manage.py ingest_clickstream`
+CLICKSTREAM_SINK = config('CLICKSTREAM_SINK', default='buffer')
+CLICKSTREAM_BATCH_SIZE = config('CLICKSTREAM_BATCH_SIZE', default=50, cast=int)
+CLICKSTREAM_FLUSH_INTERVAL = config('CLICKSTREAM_FLUSH_INTERVAL', default=5.0, cast=float)
+CLICKSTREAM_MAX_QUEUE = config('CLICKSTREAM_MAX_QUEUE', default=5000, cast=int)
+CLICKSTREAM_SPOOL_DIR = config('CLICKSTREAM_SPOOL_DIR', default=str(BASE_DIR / 'clickstream_spool'))
+CLICKSTREAM_SPOOL_MAX_BYTES = config('CLICKSTREAM_SPOOL_MAX_BYTES', default=8 * 1024 * 1024, cast=int)
+CLICKSTREAM_SPOOL_MAX_AGE = config('CLICKSTREAM_SPOOL_MAX_AGE', default=60, cast=int)
+# Per-worker LRU of dictionary-encoded strings (component, url, user agent, ...) -> id
+CLICKSTREAM_DIMENSION_CACHE_SIZE = config('CLICKSTREAM_DIMENSION_CACHE_SIZE', default=10000, cast=int)
+
+# ClickstreamMiddleware page-view sampling: path prefix -> fraction of GET requests logged.
+# A leading '=' matches the path exactly; 0 disables tracking (e.g. views that log themselves).
+CLICKSTREAM_DEFAULT_SAMPLE_RATE = config('CLICKSTREAM_DEFAULT_SAMPLE_RATE', default=1.0, cast=float)
+CLICKSTREAM_SAMPLE_RATES = {
+    '/admin/': 0,
+    '/static/': 0,
+    '/media/': 0,
+    '/admin-analytics/': 0,
+    '/track-video/': 0,
+    '/track-events/': 0,
+    '/submit-quiz/': 0,
+    '/mark-read/': 0,
+    '=/': 0,
+    '/login/': 0,
+    '/logout/': 0,
+    '/register/': 0,
+    '/dashboard/': 0,
+    '/course/': 0,
+    '/content/': 0,
+}
+
+# Cached per-user progress summaries (dashboard / course pages); writers invalidate them on commit,
+# which other processes only see through a shared cache
+PROGRESS_SUMMARY_CACHE_SECONDS = config('PROGRESS_SUMMARY_CACHE_SECONDS', default=3600 if SHARED_CACHE else 30, cast=int)
+
+# Video heartbeats are coalesced in the cache and written to VideoAnalytics at most this often
+VIDEO_HEARTBEAT_WRITE_SECONDS = config('VIDEO_HEARTBEAT_WRITE_SECONDS', default=30, cast=int)
+
+# Session reconstruction / funnel analytics - inactivity gap that ends a session, and result cache lifetime
+CLICKSTREAM_SESSION_GAP_MINUTES = config('CLICKSTREAM_SESSION_GAP_MINUTES', default=30, cast=int)
+CLICKSTREAM_FUNNEL_CACHE_SECONDS = config('CLICKSTREAM_FUNNEL_CACHE_SECONDS', default=300, cast=int)
+
+# Clickstream retention - `manage.py archive_clickstream` moves older events into gzip month partitions
+CLICKSTREAM_RETENTION_DAYS = config('CLICKSTREAM_RETENTION_DAYS', default=90, cast=int)
+CLICKSTREAM_ARCHIVE_DIR = config('CLICKSTREAM_ARCHIVE_DIR', default=str(MEDIA_ROOT / 'clickstream_archive'))
+
+# Cached live-quiz questions and answer keys; teacher edits bump a version, but without a shared cache
+# other processes keep grading with the old answer key until this expires
+QUIZ_QUESTION_CACHE_SECONDS = config('QUIZ_QUESTION_CACHE_SECONDS', default=3600 if SHARED_CACHE else 10, cast=int)
+
+# Cached per-question answer distributions for the quiz results page; dropped on every submission
+# (in the submitting process only, without a shared cache)
+QUIZ_STATS_CACHE_SECONDS = config('QUIZ_STATS_CACHE_SECONDS', default=3600 if SHARED_CACHE else 10, cast=int)
+
+# Live quiz monitor - how often the page polls for changes, and how often it re-reads the database even
+# without a counter change (counters in a per-process cache miss other workers)
+QUIZ_MONITOR_POLL_SECONDS = config('QUIZ_MONITOR_POLL_SECONDS', default=3, cast=int)
+QUIZ_MONITOR_RESYNC_SECONDS = config('QUIZ_MONITOR_RESYNC_SECONDS', default=10, cast=int)
+# Push updates over Server-Sent Events instead; each open monitor holds a worker for up to
+# QUIZ_MONITOR_STREAM_SECONDS, so only enable this with async workers and a shared cache
+QUIZ_MONITOR_SSE = config('QUIZ_MONITOR_SSE', default=False, cast=bool)
+QUIZ_MONITOR_STREAM_SECONDS = config('QUIZ_MONITOR_STREAM_SECONDS', default=300, cast=int)
+
+# Background jobs (`manage.py run_jobs`) - attempts before giving up, first retry delay (doubles per attempt),
+# and how long a claimed job may run before another worker takes it over
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+JOB_RETRY_SECONDS = config('JOB_RETRY_SECONDS', default=30, cast=int)
+JOB_LOCK_SECONDS = config('JOB_LOCK_SECONDS', default=600, cast=int)
+# Only for deployments without a run_jobs process: run jobs on an in-process thread pool after commit
+JOBS_RUN_INLINE = config('JOBS_RUN_INLINE', default=False, cast=bool)
+
+# Leaderboards (course, global, live quiz) kept in memory per process; least recently used ones are rebuilt on demand
+LEADERBOARD_CACHE_SIZE = config('LEADERBOARD_CACHE_SIZE', default=200, cast=int)
+
+# Cached map of active quiz codes used by join_quiz; start/end drop it, and without a shared cache
+# this bounds how long other processes keep accepting joins to an ended quiz
+QUIZ_CODE_CACHE_SECONDS = config('QUIZ_CODE_CACHE_SECONDS', default=300 if SHARED_CACHE else 10, cast=int)
+
 # Additional settings for Render deployment
 if not DEBUG:
     # Security settings for production
@@ -0,0 +1,84 @@
+// Client-side tracking queue
+// Events are batched and sent to /track-events/ every few seconds, when the
+// batch fills up, or with navigator.sendBeacon when the page is hidden/unloaded.
+
+const EventQueue = (function() {
+    const ENDPOINT = '/track-events/';
+    const FLUSH_INTERVAL_MS = 5000;
+    const MAX_BATCH = 50;          // server accepts up to 200 per request
+    const MAX_QUEUED = 500;        // drop the oldest events beyond this
+
+    let queue = [];
+    let timer = null;
+
+    function schedule() {
+        if (!timer) {
+            timer = setTimeout(function() { flush(false); }, FLUSH_INTERVAL_MS);
+        }
+    }
+
+    function push(type, data) {
+        queue.push(Object.assign({ type: type, ts: Date.now() }, data || {}));
+        if (queue.length > MAX_QUEUED) {
+            queue.splice(0, queue.length - MAX_QUEUED);
+        }
+        if (queue.length >= MAX_BATCH) {
+            flush(false);
+        } else {
+            schedule();
+        }
+    }
+
+    function send(batch, useBeacon) {
+        const body = JSON.stringify({ events: batch });
+
+        if (useBeacon && navigator.sendBeacon) {
+            const blob = new Blob([body], { type: 'application/json' });
+            if (navigator.sendBeacon(ENDPOINT, blob)) {
+                return;
+            }
+        }
+
+        fetch(ENDPOINT, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            credentials: 'same-origin',
+            keepalive: true,
+            body: body
+        }).catch(function() {
+            // Put the batch back so the next flush retries it
+            queue = batch.concat(queue).slice(-MAX_QUEUED);
+            schedule();
+        });
+    }
+
+    function flush(useBeacon) {
+        if (timer) {
+            clearTimeout(timer);
+            timer = null;
+        }
+        while (queue.length) {
+            send(queue.splice(0, MAX_BATCH), useBeacon);
+            if (!useBeacon) {
+                break;
+            }
+        }
+        if (queue.length) {
+            schedule();
+        }
+    }
+
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'hidden') {
+            flush(true);
+        }
+    });
+    window.addEventListener('pagehide', function() { flush(true); });
+
+    return {
+        push: push,
+        flush: function() { flush(false); }
+    };
+})();
+
+window.EventQueue = EventQueue;